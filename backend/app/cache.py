@@ -0,0 +1,82 @@
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING: Any = object()
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        jitter: float = 0.0,
+        refresh_ratio: float = 0.0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # spreads out expiry of entries filled together, e.g. by the startup warm-up
+        self.jitter = jitter
+        # entries in the last refresh_ratio of their lifetime are due for an early refresh
+        self.refresh_ratio = refresh_ratio
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        item = self._entries.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl_seconds
+        if self.jitter > 0:
+            ttl *= 1 - self.jitter * random.random()
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def needs_refresh(self, key: K) -> bool:
+        if self.refresh_ratio <= 0:
+            return False
+        item = self._entries.get(key, _MISSING)
+        if item is _MISSING:
+            return False
+        return item[0] - time.monotonic() < self.ttl_seconds * self.refresh_ratio
+
+    def pop(self, key: K) -> V | None:
+        item = self._entries.pop(key, None)
+        return item[1] if item is not None else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
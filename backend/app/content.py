@@ -0,0 +1,203 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config import settings
+from .metrics import content_io_duration
+from .singleflight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+CONTENT_DIR = Path(__file__).resolve().parent.parent / "content"
+VARIANT_SUFFIXES = {"br": "br", "gzip": "gz"}
+
+
+def resolve_content_path(content_path: str) -> Path:
+    path = Path(content_path)
+    if not path.is_absolute():
+        path = CONTENT_DIR / content_path
+    return path
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def variant_path(path: Path, digest: str, encoding: str) -> Path:
+    return path.with_name(f"{path.name}.{digest}.{VARIANT_SUFFIXES[encoding]}")
+
+
+def available_encodings() -> list[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def write_variants(path: Path) -> list[Path]:
+    # precompress once at import time so requests never compress on the fly
+    data = path.read_bytes()
+    digest = content_digest(data)
+    written = []
+    for encoding in available_encodings():
+        target = variant_path(path, digest, encoding)
+        if not target.exists():
+            compressed = compress(data, encoding)
+            tmp = target.with_name(f"{target.name}.tmp")
+            tmp.write_bytes(compressed)
+            tmp.replace(target)
+        written.append(target)
+    for stale in path.parent.glob(f"{path.name}.*"):
+        if stale not in written and stale.suffix.lstrip(".") in VARIANT_SUFFIXES.values():
+            stale.unlink(missing_ok=True)
+    return written
+
+
+@dataclass
+class CachedMarkdown:
+    text: str
+    mtime_ns: int
+    size: int
+    digest: str
+    checked_at: float
+
+
+def _stat(path: Path) -> os.stat_result | None:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _read(path: Path) -> tuple[str, str, os.stat_result]:
+    with path.open("rb") as handle:
+        stat = os.fstat(handle.fileno())
+        data = handle.read()
+    return data.decode("utf-8"), content_digest(data), stat
+
+
+class MarkdownCache:
+    def __init__(self, max_bytes: int, revalidate_seconds: float) -> None:
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: OrderedDict[str, CachedMarkdown] = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # concurrent misses and revalidations of one file share a single stat/read
+        self.flight: SingleFlight[str, CachedMarkdown] = SingleFlight("markdown")
+
+    async def get(self, content_path: str) -> str:
+        entry = await self.get_entry(content_path)
+        return entry.text
+
+    async def get_entry(self, content_path: str) -> CachedMarkdown:
+        entry = self._entries.get(content_path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.revalidate_seconds:
+            return self._hit(content_path, entry)
+        return await self.flight.do(content_path, lambda: self._load(content_path))
+
+    async def _load(self, content_path: str) -> CachedMarkdown:
+        path = resolve_content_path(content_path)
+        entry = self._entries.get(content_path)
+        now = time.monotonic()
+        if entry is not None:
+            with content_io_duration.time("stat"):
+                stat = await asyncio.to_thread(_stat, path)
+            if stat is None:
+                self.invalidate(content_path)
+                raise FileNotFoundError(path)
+            if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+                entry.checked_at = now
+                return self._hit(content_path, entry)
+            self.invalidate(content_path)
+
+        self.misses += 1
+        with content_io_duration.time("read"):
+            text, digest, stat = await asyncio.to_thread(_read, path)
+        entry = CachedMarkdown(
+            text=text,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=digest,
+            checked_at=time.monotonic(),
+        )
+        self._store(content_path, entry)
+        return entry
+
+    async def stat(self, content_path: str) -> tuple[int, int]:
+        entry = self._entries.get(content_path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.revalidate_seconds:
+            return entry.mtime_ns, entry.size
+        with content_io_duration.time("stat"):
+            stat = await asyncio.to_thread(_stat, resolve_content_path(content_path))
+        if stat is None:
+            self.invalidate(content_path)
+            raise FileNotFoundError(content_path)
+        if entry is not None:
+            if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+                entry.checked_at = now
+            else:
+                self.invalidate(content_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def invalidate(self, content_path: str | None = None) -> None:
+        if content_path is None:
+            self._entries.clear()
+            self.current_bytes = 0
+            return
+        entry = self._entries.pop(content_path, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _hit(self, content_path: str, entry: CachedMarkdown) -> CachedMarkdown:
+        self.hits += 1
+        self._entries.move_to_end(content_path)
+        return entry
+
+    def _store(self, content_path: str, entry: CachedMarkdown) -> None:
+        if entry.size > self.max_bytes:
+            return
+        self.invalidate(content_path)
+        self._entries[content_path] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.evictions += 1
+
+
+markdown_cache = MarkdownCache(
+    max_bytes=settings.content_cache_max_bytes,
+    revalidate_seconds=settings.content_cache_revalidate_seconds,
+)
+
+
+async def find_variant(content_path: str, digest: str, encoding: str) -> Path | None:
+    path = variant_path(resolve_content_path(content_path), digest, encoding)
+    exists = await asyncio.to_thread(path.is_file)
+    return path if exists else None
@@ -1,59 +1,532 @@
-from sqlalchemy import select
+import base64
+from collections import Counter
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import models, schemas
+from .cache import TTLCache
+from .config import settings
+from .database import engine, open_read_session
+from .search import search_index
+from .singleflight import SingleFlight
+
+
+def detached_copy(instance):
+    # cached rows must not stay bound to the session that loaded them
+    mapper = inspect(type(instance))
+    return mapper.class_(
+        **{attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs}
+    )
+
+
+class PostCache:
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        jitter: float = 0.0,
+        refresh_ratio: float = 0.0,
+    ) -> None:
+        self.by_id: TTLCache[int, models.Post] = TTLCache(
+            max_entries, ttl_seconds, jitter, refresh_ratio
+        )
+        self.by_slug: TTLCache[str, models.Post] = TTLCache(
+            max_entries, ttl_seconds, jitter, refresh_ratio
+        )
+        self.pages: TTLCache[tuple, tuple[list[dict], str | None]] = TTLCache(
+            max_entries, ttl_seconds
+        )
+        self.versions: TTLCache[tuple, tuple[datetime | None, int]] = TTLCache(
+            max_entries, ttl_seconds
+        )
+        self.tags: TTLCache[str, list[models.Tag]] = TTLCache(1, ttl_seconds)
+        # bumped on every write so reads that raced an invalidation are not stored
+        self.generation = 0
+        # called after every invalidation, e.g. to rebuild derived snapshots
+        self.listeners: list[Callable[[], None]] = []
+
+    def store(self, post: models.Post, generation: int) -> models.Post:
+        cached = detached_copy(post)
+        if generation != self.generation:
+            return cached
+        self.by_id.set(cached.id, cached)
+        if cached.slug:
+            self.by_slug.set(cached.slug, cached)
+        return cached
+
+    def store_page(
+        self,
+        key: tuple,
+        items: list[dict],
+        next_cursor: str | None,
+        generation: int,
+    ) -> None:
+        if generation != self.generation:
+            return
+        self.pages.set(key, (items, next_cursor))
+
+    def invalidate(self, *posts: models.Post) -> None:
+        self.generation += 1
+        for post in posts:
+            cached = self.by_id.pop(post.id) if post.id is not None else None
+            for slug in {post.slug, cached.slug if cached else None}:
+                if slug:
+                    self.by_slug.pop(slug)
+        self.pages.clear()
+        self.versions.clear()
+        self.tags.clear()
+        self._notify()
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.by_id.clear()
+        self.by_slug.clear()
+        self.pages.clear()
+        self.versions.clear()
+        self.tags.clear()
+        self._notify()
+
+    def _notify(self) -> None:
+        for listener in self.listeners:
+            listener()
+
+    def stats(self) -> dict:
+        return {
+            "by_id": self.by_id.stats(),
+            "by_slug": self.by_slug.stats(),
+            "pages": self.pages.stats(),
+            "versions": self.versions.stats(),
+            "tags": self.tags.stats(),
+        }
+
+
+post_cache = PostCache(
+    max_entries=settings.post_cache_max_entries,
+    ttl_seconds=settings.post_cache_ttl_seconds,
+    jitter=settings.post_cache_ttl_jitter,
+    refresh_ratio=settings.post_cache_refresh_ratio,
+)
+# keyed by (column, value, generation, prefer_primary): a load that started before a
+# write is never joined after it, and primary-only reads never join a replica load
+post_flights: SingleFlight[tuple, models.Post | None] = SingleFlight("posts")
+
+user_cache: TTLCache[int, models.User] = TTLCache(
+    max_entries=settings.auth_cache_max_entries,
+    ttl_seconds=settings.auth_cache_ttl_seconds,
+)
+
+
+def encode_cursor(post) -> str:
+    raw = f"{post.created_at.isoformat()}|{post.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, post_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _filter_posts(stmt, tag: str | None, visibility: str | None):
+    if visibility:
+        stmt = stmt.where(models.Post.visibility == visibility)
+    if tag:
+        tagged = (
+            select(models.PostTag.post_id)
+            .join(models.Tag, models.Tag.id == models.PostTag.tag_id)
+            .where(models.Tag.name == tag)
+        )
+        stmt = stmt.where(models.Post.id.in_(tagged))
+    return stmt
+
+
+def split_tags(value: list[str] | str | None) -> list[str]:
+    if not value:
+        return []
+    items = value.split(",") if isinstance(value, str) else value
+    names = []
+    for item in items:
+        name = item.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+async def set_post_tags(
+    session: AsyncSession, post: models.Post, names: list[str]
+) -> None:
+    await set_posts_tags(session, [(post, names)])
+
+
+async def set_posts_tags(
+    session: AsyncSession, assignments: list[tuple[models.Post, list[str]]]
+) -> None:
+    # diff post_tags against the wanted names and adjust tags.post_count in place,
+    # with a fixed number of statements however many posts are retagged
+    if not assignments:
+        return
+    tags = models.Tag.__table__
+    post_tags = models.PostTag.__table__
+    result = await session.execute(
+        select(post_tags.c.post_id, tags.c.name, tags.c.id)
+        .join(tags, tags.c.id == post_tags.c.tag_id)
+        .where(post_tags.c.post_id.in_([post.id for post, _ in assignments]))
+    )
+    current: dict[int, dict[str, int]] = {}
+    for post_id, name, tag_id in result.all():
+        current.setdefault(post_id, {})[name] = tag_id
+
+    wanted = {name for _, names in assignments for name in names}
+    tag_ids: dict[str, int] = {}
+    if wanted:
+        result = await session.execute(
+            select(tags.c.name, tags.c.id).where(tags.c.name.in_(wanted))
+        )
+        tag_ids = dict(result.all())
+        missing = sorted(wanted - tag_ids.keys())
+        if missing:
+            await session.execute(
+                insert(tags), [{"name": name, "post_count": 0} for name in missing]
+            )
+            result = await session.execute(
+                select(tags.c.name, tags.c.id).where(tags.c.name.in_(missing))
+            )
+            tag_ids.update(result.all())
+
+    removed: list[tuple[int, int]] = []
+    added: list[dict[str, int]] = []
+    counts: Counter[int] = Counter()
+    for post, names in assignments:
+        linked = current.get(post.id, {})
+        for name, tag_id in linked.items():
+            if name not in names:
+                removed.append((post.id, tag_id))
+                counts[tag_id] -= 1
+        for name in names:
+            if name not in linked:
+                added.append({"post_id": post.id, "tag_id": tag_ids[name]})
+                counts[tag_ids[name]] += 1
+        post.tags = ",".join(names)
+
+    if removed:
+        await session.execute(
+            delete(post_tags).where(
+                tuple_(post_tags.c.post_id, post_tags.c.tag_id).in_(removed)
+            )
+        )
+    if added:
+        await session.execute(insert(post_tags), added)
+    changes = [
+        {"tag_id": tag_id, "delta": delta} for tag_id, delta in counts.items() if delta
+    ]
+    if changes:
+        # core executemany: one statement, one row of parameters per tag
+        await session.execute(
+            update(tags)
+            .where(tags.c.id == bindparam("tag_id"))
+            .values(post_count=tags.c.post_count + bindparam("delta")),
+            changes,
+        )
 
 
-async def list_posts(session: AsyncSession) -> list[models.Post]:
+async def list_tags(session: AsyncSession, cached: bool = True) -> list[models.Tag]:
+    if cached:
+        tags = post_cache.tags.get("all")
+        if tags is not None:
+            return tags
+    generation = post_cache.generation
     result = await session.execute(
-        select(models.Post).order_by(models.Post.created_at.desc())
+        select(models.Tag)
+        .where(models.Tag.post_count > 0)
+        .order_by(models.Tag.post_count.desc(), models.Tag.name)
+    )
+    tags = list(result.scalars().all())
+    if generation == post_cache.generation:
+        post_cache.tags.set("all", tags)
+    return tags
+
+
+async def posts_version(
+    session: AsyncSession,
+    tag: str | None = None,
+    visibility: str | None = None,
+    cached: bool = True,
+) -> tuple[datetime | None, int]:
+    # (latest updated_at, row count) changes on every insert, update and delete
+    key = (tag, visibility)
+    if cached:
+        version = post_cache.versions.get(key)
+        if version is not None:
+            return version
+    generation = post_cache.generation
+    stmt = _filter_posts(
+        select(func.max(models.Post.updated_at), func.count(models.Post.id)),
+        tag,
+        visibility,
+    )
+    result = await session.execute(stmt)
+    latest, total = result.one()
+    version = (latest, total)
+    if generation == post_cache.generation:
+        post_cache.versions.set(key, version)
+    return version
+
+
+# only the columns PostOut exposes; rows skip ORM hydration entirely
+POST_LIST_COLUMNS = (
+    models.Post.id,
+    models.Post.title,
+    models.Post.excerpt,
+    models.Post.tags,
+    models.Post.slug,
+    models.Post.visibility,
+    models.Post.created_at,
+    models.Post.updated_at,
+)
+
+
+def post_list_item(row) -> dict:
+    item = row._asdict()
+    # same normalization as PostBase.normalize_tags, done once before caching
+    item["tags"] = [name.strip() for name in (row.tags or "").split(",") if name.strip()]
+    return item
+
+
+async def list_posts(
+    session: AsyncSession,
+    limit: int = 20,
+    cursor: tuple[datetime, int] | None = None,
+    tag: str | None = None,
+    visibility: str | None = None,
+    cached: bool = True,
+) -> tuple[list[dict], str | None]:
+    key = (limit, cursor, tag, visibility)
+    if cached:
+        page = post_cache.pages.get(key)
+        if page is not None:
+            return page
+    generation = post_cache.generation
+    # keyset pagination on (created_at, id), served by ix_posts_created_at_id
+    stmt = _filter_posts(select(*POST_LIST_COLUMNS), tag, visibility)
+    if cursor is not None:
+        created_at, post_id = cursor
+        stmt = stmt.where(
+            or_(
+                models.Post.created_at < created_at,
+                and_(
+                    models.Post.created_at == created_at,
+                    models.Post.id < post_id,
+                ),
+            )
+        )
+    stmt = stmt.order_by(
+        models.Post.created_at.desc(), models.Post.id.desc()
+    ).limit(limit + 1)
+    rows = (await session.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    items = [post_list_item(row) for row in rows]
+    post_cache.store_page(key, items, next_cursor, generation)
+    return items, next_cursor
+
+
+async def _load_post(
+    session: AsyncSession, column: str, value: int | str, generation: int
+) -> models.Post | None:
+    # shared between concurrent callers on different sessions, so always a detached copy
+    if column == "id":
+        post = await session.get(models.Post, value)
+    else:
+        result = await session.execute(
+            select(models.Post).where(models.Post.slug == value)
+        )
+        post = result.scalars().first()
+    return post_cache.store(post, generation) if post is not None else None
+
+
+async def _load_shared_post(
+    column: str, value: int | str, generation: int, prefer_primary: bool
+) -> models.Post | None:
+    # every caller for the key awaits this one load, so it owns its session: a
+    # cancelled or closed request session cannot fail the others
+    session = await open_read_session(prefer_primary)
+    async with session:
+        return await _load_post(session, column, value, generation)
+
+
+async def _get_cached_post(
+    session: AsyncSession,
+    entries: TTLCache,
+    column: str,
+    value: int | str,
+) -> models.Post | None:
+    generation = post_cache.generation
+    # callers on the primary (read-your-writes) must not join a load from a replica
+    prefer_primary = session.bind is engine
+    key = (column, value, generation, prefer_primary)
+    post = entries.get(value)
+    if post is not None:
+        if entries.needs_refresh(value):
+            # served from cache now; one background load renews it before it expires
+            post_flights.refresh(
+                key,
+                lambda: _load_shared_post(column, value, generation, prefer_primary),
+            )
+        return post
+    return await post_flights.do(
+        key, lambda: _load_shared_post(column, value, generation, prefer_primary)
     )
-    return result.scalars().all()
 
 
-async def get_post(session: AsyncSession, post_id: int) -> models.Post | None:
+async def get_post(
+    session: AsyncSession, post_id: int, cached: bool = True
+) -> models.Post | None:
+    if cached:
+        return await _get_cached_post(session, post_cache.by_id, "id", post_id)
     return await session.get(models.Post, post_id)
 
 
-async def get_post_by_slug(session: AsyncSession, slug: str) -> models.Post | None:
+async def get_post_by_slug(
+    session: AsyncSession, slug: str, cached: bool = True
+) -> models.Post | None:
+    if cached:
+        return await _get_cached_post(session, post_cache.by_slug, "slug", slug)
     result = await session.execute(
         select(models.Post).where(models.Post.slug == slug)
     )
     return result.scalars().first()
 
 
+async def warm_post_cache(session: AsyncSession, limit: int) -> list[models.Post]:
+    # recently updated posts stand in for "hot" ones; there is no view counter
+    generation = post_cache.generation
+    result = await session.execute(
+        select(models.Post)
+        .order_by(models.Post.updated_at.desc(), models.Post.id.desc())
+        .limit(limit)
+    )
+    return [post_cache.store(post, generation) for post in result.scalars().all()]
+
+
+async def get_posts_by_ids(
+    session: AsyncSession, post_ids: list[int]
+) -> dict[int, models.Post]:
+    if not post_ids:
+        return {}
+    result = await session.execute(
+        select(models.Post).where(models.Post.id.in_(post_ids))
+    )
+    return {post.id: post for post in result.scalars().all()}
+
+
+async def get_posts_by_slugs(
+    session: AsyncSession, slugs: list[str]
+) -> dict[str, models.Post]:
+    if not slugs:
+        return {}
+    result = await session.execute(
+        select(models.Post).where(models.Post.slug.in_(slugs))
+    )
+    return {post.slug: post for post in result.scalars().all()}
+
+
+async def get_posts_batch(
+    session: AsyncSession, post_ids: list[int], slugs: list[str]
+) -> tuple[dict[int, models.Post], dict[str, models.Post]]:
+    # ids and slugs resolved together in a single IN query
+    conditions = []
+    if post_ids:
+        conditions.append(models.Post.id.in_(post_ids))
+    if slugs:
+        conditions.append(models.Post.slug.in_(slugs))
+    if not conditions:
+        return {}, {}
+    result = await session.execute(select(models.Post).where(or_(*conditions)))
+    by_id: dict[int, models.Post] = {}
+    by_slug: dict[str, models.Post] = {}
+    for post in result.scalars().all():
+        by_id[post.id] = post
+        if post.slug:
+            by_slug[post.slug] = post
+    return by_id, by_slug
+
+
+async def _attach(session: AsyncSession, instance):
+    # rows served from post_cache/user_cache are detached copies
+    if instance in session:
+        return instance
+    return await session.merge(instance)
+
+
+async def get_user(
+    session: AsyncSession, user_id: int, cached: bool = True
+) -> models.User | None:
+    if cached:
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+    user = await session.get(models.User, user_id)
+    if user is not None and cached:
+        user_cache.set(user_id, detached_copy(user))
+    return user
+
+
 async def create_post(session: AsyncSession, payload: schemas.PostCreate) -> models.Post:
-    tags = ",".join(payload.tags)
     post = models.Post(
         title=payload.title,
         excerpt=payload.excerpt,
         content_path=payload.content_path,
-        tags=tags,
+        tags="",
         slug=payload.slug,
         visibility=payload.visibility,
     )
     session.add(post)
+    await session.flush()
+    await set_post_tags(session, post, split_tags(payload.tags))
     await session.commit()
     await session.refresh(post)
+    post_cache.invalidate(post)
+    await search_index.index_post(post)
     return post
 
 
 async def update_post(
     session: AsyncSession, db_post: models.Post, payload: schemas.PostUpdate
 ) -> models.Post:
+    db_post = await _attach(session, db_post)
+    previous_slug = db_post.slug
     data = payload.dict(exclude_unset=True)
-    if "tags" in data and data["tags"] is not None:
-        tags = data["tags"]
-        if isinstance(tags, list):
-            data["tags"] = ",".join(tags)
-        elif isinstance(tags, str):
-            data["tags"] = ",".join(
-                [item.strip() for item in tags.split(",") if item.strip()]
-            )
+    tags = data.pop("tags", None)
     for key, value in data.items():
         setattr(db_post, key, value)
+    if tags is not None:
+        await set_post_tags(session, db_post, split_tags(tags))
     await session.commit()
     await session.refresh(db_post)
+    post_cache.invalidate(db_post)
+    if previous_slug and previous_slug != db_post.slug:
+        post_cache.by_slug.pop(previous_slug)
+    await search_index.index_post(db_post)
     return db_post
 
 
@@ -76,17 +549,216 @@ async def create_user(
     return user
 
 
+async def update_password_hash(
+    session: AsyncSession, user: models.User, password_hash: str
+) -> models.User:
+    user = await _attach(session, user)
+    user.password_hash = password_hash
+    await session.commit()
+    user_cache.pop(user.id)
+    return user
+
+
 async def upgrade_membership(
     session: AsyncSession, user: models.User, expires_at
 ) -> models.User:
+    user = await _attach(session, user)
     if user.role != "admin":
         user.role = "member"
     user.membership_expires_at = expires_at
     await session.commit()
     await session.refresh(user)
+    user_cache.pop(user.id)
     return user
 
 
 async def delete_post(session: AsyncSession, db_post: models.Post) -> None:
+    db_post = await _attach(session, db_post)
+    await set_post_tags(session, db_post, [])
     await session.delete(db_post)
     await session.commit()
+    post_cache.invalidate(db_post)
+    search_index.remove_post(db_post.id)
+
+
+async def _detach_tags(session: AsyncSession, post_ids: list[int]) -> None:
+    # set-based counterpart of set_post_tags(..., []) for many posts at once
+    result = await session.execute(
+        select(models.PostTag.tag_id, func.count(models.PostTag.post_id))
+        .where(models.PostTag.post_id.in_(post_ids))
+        .group_by(models.PostTag.tag_id)
+    )
+    decrements = result.all()
+    if decrements:
+        tags = models.Tag.__table__
+        # core executemany: one statement, one row of parameters per tag
+        await session.execute(
+            update(tags)
+            .where(tags.c.id == bindparam("tag_id"))
+            .values(post_count=tags.c.post_count - bindparam("removed")),
+            [{"tag_id": tag_id, "removed": count} for tag_id, count in decrements],
+        )
+    await session.execute(
+        delete(models.PostTag).where(models.PostTag.post_id.in_(post_ids))
+    )
+
+
+async def bulk_create_posts(
+    session: AsyncSession, payloads: list[schemas.PostCreate]
+) -> list[schemas.BulkItemResult]:
+    existing = await get_posts_by_slugs(
+        session, [payload.slug for payload in payloads if payload.slug]
+    )
+    results: list[schemas.BulkItemResult] = []
+    created: list[tuple[models.Post, list[str]]] = []
+    seen: set[str] = set()
+    for payload in payloads:
+        if payload.slug and (payload.slug in existing or payload.slug in seen):
+            results.append(
+                schemas.BulkItemResult(slug=payload.slug, status="conflict")
+            )
+            continue
+        if payload.slug:
+            seen.add(payload.slug)
+        post = models.Post(
+            title=payload.title,
+            excerpt=payload.excerpt,
+            content_path=payload.content_path,
+            tags="",
+            slug=payload.slug,
+            visibility=payload.visibility,
+        )
+        created.append((post, split_tags(payload.tags)))
+        results.append(schemas.BulkItemResult(slug=payload.slug, status="created"))
+    session.add_all(post for post, _ in created)
+    await session.flush()
+    await set_posts_tags(session, [(post, tags) for post, tags in created if tags])
+    await session.commit()
+
+    created_posts = [post for post, _ in created]
+    post_cache.invalidate(*created_posts)
+    for post in created_posts:
+        await search_index.index_post(post)
+    by_post = iter(created_posts)
+    for result in results:
+        if result.status == "created":
+            result.id = next(by_post).id
+    return results
+
+
+async def bulk_update_posts(
+    session: AsyncSession, items: list[schemas.PostBulkUpdateItem]
+) -> list[schemas.BulkItemResult]:
+    posts = await get_posts_by_slugs(session, [item.slug for item in items])
+    results: list[schemas.BulkItemResult] = []
+    rows: list[dict] = []
+    retagged: list[tuple[models.Post, list[str]]] = []
+    now = models.utcnow()
+    for item in items:
+        post = posts.get(item.slug)
+        if post is None:
+            results.append(schemas.BulkItemResult(slug=item.slug, status="not_found"))
+            continue
+        data = item.changes.dict(exclude_unset=True)
+        tags = data.pop("tags", None)
+        rows.append({"id": post.id, **data, "updated_at": now})
+        if tags is not None:
+            retagged.append((post, split_tags(tags)))
+        results.append(
+            schemas.BulkItemResult(slug=item.slug, status="updated", id=post.id)
+        )
+    if rows:
+        await session.execute(update(models.Post), rows)
+    await set_posts_tags(session, retagged)
+    await session.commit()
+
+    touched = await get_posts_by_ids(session, [row["id"] for row in rows])
+    post_cache.invalidate(*posts.values())
+    for post in touched.values():
+        await search_index.index_post(post)
+    return results
+
+
+async def bulk_delete_posts(
+    session: AsyncSession, slugs: list[str]
+) -> list[schemas.BulkItemResult]:
+    posts = await get_posts_by_slugs(session, slugs)
+    post_ids = [post.id for post in posts.values()]
+    if post_ids:
+        await _detach_tags(session, post_ids)
+        await session.execute(
+            delete(models.Post).where(models.Post.id.in_(post_ids)),
+            execution_options={"synchronize_session": False},
+        )
+        await session.commit()
+    post_cache.invalidate(*posts.values())
+    for post_id in post_ids:
+        search_index.remove_post(post_id)
+    return [
+        schemas.BulkItemResult(slug=slug, status="deleted", id=posts[slug].id)
+        if slug in posts
+        else schemas.BulkItemResult(slug=slug, status="not_found")
+        for slug in slugs
+    ]
+
+
+async def bulk_set_visibility(
+    session: AsyncSession, slugs: list[str], visibility: str
+) -> list[schemas.BulkItemResult]:
+    posts = await get_posts_by_slugs(session, slugs)
+    if posts:
+        await session.execute(
+            update(models.Post)
+            .where(models.Post.slug.in_(list(posts)))
+            .values(visibility=visibility, updated_at=models.utcnow()),
+            execution_options={"synchronize_session": False},
+        )
+        await session.commit()
+    post_cache.invalidate(*posts.values())
+    return [
+        schemas.BulkItemResult(slug=slug, status="updated", id=posts[slug].id)
+        if slug in posts
+        else schemas.BulkItemResult(slug=slug, status="not_found")
+        for slug in slugs
+    ]
+
+
+async def revoke_token(
+    session: AsyncSession, jti: str, user_id: int | None, expires_at: datetime
+) -> None:
+    # logging out twice with the same token is not an error
+    exists = await session.scalar(
+        select(models.RevokedToken.id).where(models.RevokedToken.jti == jti)
+    )
+    if exists is not None:
+        return
+    session.add(models.RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+    await session.commit()
+
+
+async def list_revoked_tokens(
+    session: AsyncSession, after_id: int = 0
+) -> list[tuple[int, str, datetime]]:
+    result = await session.execute(
+        select(
+            models.RevokedToken.id,
+            models.RevokedToken.jti,
+            models.RevokedToken.expires_at,
+        )
+        .where(
+            models.RevokedToken.id > after_id,
+            models.RevokedToken.expires_at > datetime.now(timezone.utc),
+        )
+        .order_by(models.RevokedToken.id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def prune_revoked_tokens(session: AsyncSession) -> int:
+    result = await session.execute(
+        delete(models.RevokedToken).where(
+            models.RevokedToken.expires_at <= datetime.now(timezone.utc)
+        )
+    )
+    await session.commit()
+    return result.rowcount or 0
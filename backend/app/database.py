@@ -1,30 +1,241 @@
+import time
 from collections.abc import AsyncIterator
 
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
+from .metrics import instrument_engine, registry
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.slow_waits = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+        if seconds >= settings.db_pool_slow_wait_seconds:
+            self.slow_waits += 1
+
+    def snapshot(self, pool) -> dict:
+        snapshot = {
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "closes": self.closes,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6)
+            if self.checkouts
+            else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "slow_waits": self.slow_waits,
+        }
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            snapshot.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    # negative while the pool is still below pool_size
+                    "overflow": pool.overflow(),
+                    "max_overflow": settings.db_max_overflow,
+                }
+            )
+        return snapshot
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # one set of counters per engine, so replicas never count into the primary's
+        self.metrics = PoolMetrics()
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # dispose() swaps in a fresh pool; the counters and listeners carry over
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
+
+
+def count_pool_events(pool) -> None:
+    if not isinstance(pool, InstrumentedQueuePool):
+        return
+    metrics = pool.metrics
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        metrics.connects += 1
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_connection, connection_record) -> None:
+        metrics.closes += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        metrics.invalidations += 1
+
+
+def pool_snapshot(db_engine) -> dict:
+    pool = db_engine.sync_engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    return metrics.snapshot(pool)
+
+
+def engine_options(database_url: str) -> dict:
+    options = {"echo": settings.db_echo, "future": True}
+    if database_url.startswith("sqlite") and (
+        ":memory:" in database_url or database_url.endswith("://")
+    ):
+        # in-memory SQLite uses a StaticPool, which takes no sizing options
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    return options
+
+
+engine = create_async_engine(
+    settings.database_url, **engine_options(settings.database_url)
+)
+instrument_engine(engine.sync_engine, "primary")
+count_pool_events(engine.sync_engine.pool)
+
+
+def _pool_collector(name: str, field: str):
+    def collect():
+        yield name, {"engine": "primary"}, pool_snapshot(engine).get(field, 0)
+        for index, replica in enumerate(replica_router.engines):
+            yield name, {"engine": f"replica{index}"}, pool_snapshot(replica).get(field, 0)
+
+    return collect
+
+
+for _name, _field, _kind, _documentation in (
+    ("mai_db_pool_checkouts_total", "checkouts", "counter", "Pool checkouts"),
+    ("mai_db_pool_timeouts_total", "timeouts", "counter", "Pool checkout timeouts"),
+    ("mai_db_pool_slow_waits_total", "slow_waits", "counter", "Slow pool checkouts"),
+    ("mai_db_pool_wait_seconds_total", "wait_seconds_total", "counter", "Time spent waiting for a connection"),
+    ("mai_db_pool_invalidations_total", "invalidations", "counter", "Invalidated connections"),
+    ("mai_db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out"),
+    ("mai_db_pool_size", "size", "gauge", "Configured pool size"),
+):
+    registry.collector(_name, _kind, _documentation, _pool_collector(_name, _field))
+
+
 AsyncSessionFactory = async_sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
 
-async def init_db() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+class ReplicaRouter:
+    def __init__(self, urls: list[str]) -> None:
+        self.engines = [
+            create_async_engine(url, **engine_options(url)) for url in urls
+        ]
+        for index, replica in enumerate(self.engines):
+            instrument_engine(replica.sync_engine, f"replica{index}")
+            count_pool_events(replica.sync_engine.pool)
+        self.factories = [
+            async_sessionmaker(replica, expire_on_commit=False, class_=AsyncSession)
+            for replica in self.engines
+        ]
+        self.unhealthy_until = [0.0] * len(self.engines)
+        self._next = 0
+        self.fallbacks = 0
+
+    def choose(self) -> int | None:
+        now = time.monotonic()
+        healthy = [
+            index
+            for index, until in enumerate(self.unhealthy_until)
+            if until <= now
+        ]
+        if not healthy:
+            return None
+        if settings.read_replica_strategy == "least_connections":
+            return min(
+                healthy, key=lambda index: self.engines[index].sync_engine.pool.checkedout()
+            )
+        self._next += 1
+        return healthy[self._next % len(healthy)]
+
+    def mark_failed(self, index: int) -> None:
+        self.unhealthy_until[index] = (
+            time.monotonic() + settings.read_replica_retry_seconds
+        )
+
+    def snapshot(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": replica.url.render_as_string(hide_password=True),
+                "healthy": self.unhealthy_until[index] <= now,
+                "pool": pool_snapshot(replica),
+            }
+            for index, replica in enumerate(self.engines)
+        ]
+
+    async def dispose(self) -> None:
+        for replica in self.engines:
+            await replica.dispose()
+
+
+replica_router = ReplicaRouter(settings.read_database_urls)
 
 
 async def get_session() -> AsyncIterator[AsyncSession]:
     async with AsyncSessionFactory() as session:
         yield session
+
+
+async def open_read_session(prefer_primary: bool = False) -> AsyncSession:
+    # a replica session whose connection is already checked out, or the primary
+    if not prefer_primary:
+        index = replica_router.choose()
+        if index is not None:
+            session = replica_router.factories[index]()
+            try:
+                await session.connection()
+                return session
+            except (exc.DBAPIError, OSError):
+                await session.close()
+                replica_router.mark_failed(index)
+        if replica_router.engines:
+            replica_router.fallbacks += 1
+    return AsyncSessionFactory()
@@ -0,0 +1,184 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+
+import anyio
+from fastapi import Request, Response, status
+from fastapi.responses import FileResponse
+
+
+def as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256(
+        "|".join("" if part is None else str(part) for part in parts).encode("utf-8")
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def coded_etag(etag: str, encoding: str | None) -> str:
+    # a gzip/br body is a different representation and needs its own strong validator
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def validator_headers(
+    etag: str, last_modified: datetime | None, cache_control: str
+) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime | None
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        return "*" in candidates or etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates only carry whole seconds
+        return as_utc(last_modified).replace(microsecond=0) <= as_utc(since)
+    return False
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def negotiate_encoding(accept_encoding: str | None, available: list[str]) -> str | None:
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    # ``available`` is ordered by preference, so ties keep the better codec
+    for encoding in available:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_byte_range(
+    request: Request, etag: str, size: int
+) -> tuple[int, int] | None:
+    # a single "bytes=" range, inclusive; None means send the whole file
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # multipart/byteranges is not worth it for Markdown; RFC 9110 allows ignoring
+        return None
+    first, separator, last = spec.strip().partition("-")
+    if not separator:
+        return None
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def range_not_satisfiable(size: int, headers: dict[str, str]) -> Response:
+    return Response(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        headers={**headers, "Content-Range": f"bytes */{size}"},
+    )
+
+
+class RangeFileResponse(FileResponse):
+    def __init__(
+        self,
+        path: Path,
+        stat_result: os.stat_result,
+        byte_range: tuple[int, int] | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.byte_range = byte_range
+        # ranges address the identity bytes; a gzip/br body cannot be resumed by range
+        self.headers["Accept-Ranges"] = (
+            "none" if "content-encoding" in self.headers else "bytes"
+        )
+        if byte_range is not None:
+            start, end = byte_range
+            self.status_code = status.HTTP_206_PARTIAL_CONTENT
+            self.headers["Content-Range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            self.headers["Content-Length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.byte_range is None:
+            # whole file: FileResponse uses http.response.pathsend when the server offers it
+            await super().__call__(scope, receive, send)
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        start, end = self.byte_range
+        remaining = end - start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+        if remaining > 0:
+            # the file shrank underneath us; close the body rather than hang
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import re
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+from .content import CONTENT_DIR, content_digest, write_variants
+from .render import write_rendered
+
+# slug -> content hash of the last imported version of each file
+MANIFEST_PATH = CONTENT_DIR / ".import-manifest.json"
+
+
+@dataclass
+class ParsedPost:
+    slug: str
+    title: str
+    excerpt: str
+    source_path: Path
+
+
+@dataclass
+class PreparedPost:
+    parsed: ParsedPost
+    content_path: str
+    digest: str
+    changed: bool
+
+
+def slugify(name: str) -> str:
+    # \w is unicode-aware, so CJK filenames keep their characters
+    slug = re.sub(r"[\W_]+", "-", name).strip("-")
+    return slug.lower() or "post"
+
+
+def assign_slugs(files: list[Path]) -> dict[Path, str]:
+    slugs: dict[Path, str] = {}
+    taken: set[str] = set()
+    for path in sorted(files):
+        slug = slugify(path.stem)
+        if slug in taken:
+            suffix = hashlib.sha1(path.stem.encode("utf-8")).hexdigest()[:6]
+            slug = f"{slug}-{suffix}"
+        taken.add(slug)
+        slugs[path] = slug
+    return slugs
+
+
+def extract_excerpt(markdown_body: str) -> str:
+    # Pick the first non-empty paragraph as excerpt, strip simple markdown syntax
+    paragraphs = [paragraph.strip() for paragraph in markdown_body.split("\n\n")]
+    for paragraph in paragraphs:
+        if not paragraph:
+            continue
+        # strip link syntax [text](url) -> text
+        paragraph = re.sub(r"\[(?P<text>[^\]]+)\]\([^\)]+\)", r"\g<text>", paragraph)
+        # remove residual markdown symbols such as #, *, `, >, _
+        paragraph = re.sub(r"[#>*`_]", "", paragraph)
+        return paragraph[:180] + ("..." if len(paragraph) > 180 else "")
+    return ""
+
+
+def parse_markdown_file(path: Path, slug: str | None = None) -> ParsedPost:
+    raw_text = path.read_text(encoding="utf-8")
+    lines = raw_text.splitlines()
+
+    title = path.stem.replace("_", " ").strip()
+    body_start = 0
+
+    for idx, line in enumerate(lines):
+        if line.startswith("# "):
+            title = line.lstrip("# ").strip()
+            body_start = idx + 1
+            break
+
+    markdown_body = "\n".join(lines[body_start:]).strip()
+    if not markdown_body:
+        markdown_body = raw_text.strip()
+
+    excerpt = extract_excerpt(markdown_body)
+
+    return ParsedPost(
+        slug=slug or slugify(path.stem),
+        title=title or path.stem,
+        excerpt=excerpt,
+        source_path=path,
+    )
+
+
+def prepare_file(
+    source: Path, slug: str, target_dir: Path, known_digest: str | None
+) -> PreparedPost:
+    # runs in a worker process or thread: parse, copy and precompute derived files
+    parsed = parse_markdown_file(source, slug)
+    data = source.read_bytes()
+    digest = content_digest(data)
+    if source.parent.resolve() == target_dir.resolve():
+        # already inside the content dir: index it in place instead of copying
+        destination = source
+    else:
+        destination = target_dir / f"{slug}{source.suffix}"
+    changed = digest != known_digest
+    missing = not destination.exists()
+    if changed or missing:
+        if missing or source.resolve() != destination.resolve():
+            shutil.copy2(source, destination)
+        write_variants(destination)
+        write_rendered(destination)
+    return PreparedPost(
+        parsed=parsed,
+        # store relative path (no leading slash) so backend can resolve against content dir
+        content_path=destination.relative_to(target_dir).as_posix(),
+        digest=digest,
+        changed=changed,
+    )
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> dict[str, str]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict[str, str], path: Path = MANIFEST_PATH) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=0), encoding="utf-8")
+    tmp.replace(path)
+
+
+def remove_derived(path: Path) -> None:
+    for derived in path.parent.glob(f"{path.name}.*"):
+        if derived.suffix in {".gz", ".br", ".html"}:
+            derived.unlink(missing_ok=True)
@@ -1,24 +1,81 @@
+import asyncio
+import hmac
+import logging
+import os
+import time
+from collections.abc import AsyncIterator
 from datetime import datetime, timedelta, timezone
-from pathlib import Path as PathlibPath
+from pathlib import Path as FilePath
+from urllib.parse import quote
 
-from fastapi import Depends, FastAPI, HTTPException, Path, status
+from fastapi import Depends, FastAPI, HTTPException, Path, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import crud, models, schemas
 from .config import settings
-from .database import get_session, init_db
+from .content import (
+    CONTENT_DIR,
+    available_encodings,
+    find_variant,
+    markdown_cache,
+    resolve_content_path,
+)
+from .database import (
+    AsyncSessionFactory,
+    engine,
+    get_session,
+    open_read_session,
+    pool_snapshot,
+    replica_router,
+)
+from .http_cache import (
+    RangeFileResponse,
+    RangeNotSatisfiable,
+    as_utc,
+    coded_etag,
+    is_not_modified,
+    make_etag,
+    negotiate_encoding,
+    not_modified,
+    parse_byte_range,
+    range_not_satisfiable,
+    validator_headers,
+)
+from .metrics import (
+    MetricsMiddleware,
+    cache_collectors,
+    registry,
+    singleflight_collectors,
+)
+from .migrations import migrate
+from .profiling import ProfilerMiddleware
+from .render import render_cache
+from .revocation import refresh_periodically, revoke, sync_revocations
+from .search import flush_periodically, search_index, sync_periodically
 from .security import (
-    create_access_token,
+    TokenUser,
+    create_user_token,
     decode_token,
     get_token_from_credentials,
-    hash_password,
+    hash_password_async,
+    needs_rehash,
+    prefers_primary,
+    revoked_tokens,
     security_scheme,
-    verify_password,
+    token_cache,
+    user_from_claims,
+    verify_password_async,
 )
+from .singleflight import flights
+from .snapshot import SnapshotPage, listing_snapshot, listing_version
+from .watcher import content_watcher
+
+logger = logging.getLogger(__name__)
 
-CONTENT_DIR = PathlibPath(__file__).resolve().parent.parent / "content"
 CONTENT_DIR.mkdir(parents=True, exist_ok=True)
 
 app = FastAPI(title="MAI API", version="0.1.0")
@@ -30,16 +87,161 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.profiling_enabled:
+    app.add_middleware(ProfilerMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+cache_collectors(
+    {
+        "markdown": markdown_cache.stats,
+        "render": render_cache.stats,
+        "posts_by_id": crud.post_cache.by_id.stats,
+        "posts_by_slug": crud.post_cache.by_slug.stats,
+        "post_pages": crud.post_cache.pages.stats,
+        "post_versions": crud.post_cache.versions.stats,
+        "tags": crud.post_cache.tags.stats,
+        "tokens": token_cache.stats,
+        "users": crud.user_cache.stats,
+        "listing": listing_snapshot.stats,
+    }
+)
+singleflight_collectors(flights)
+registry.collector(
+    "mai_revoked_tokens",
+    "gauge",
+    "Unexpired revoked tokens held in memory",
+    lambda: (("mai_revoked_tokens", {}, len(revoked_tokens)),),
+)
+
+
+background_tasks: set[asyncio.Task] = set()
+
+
+startup_timings: dict[str, float] = {}
+registry.collector(
+    "mai_startup_seconds",
+    "gauge",
+    "Time spent in each startup phase",
+    lambda: (
+        ("mai_startup_seconds", {"phase": phase}, seconds)
+        for phase, seconds in startup_timings.items()
+    ),
+)
+
+
+async def warm_up(limit: int) -> tuple[int, int]:
+    async with AsyncSessionFactory() as session:
+        posts = await crud.warm_post_cache(session, limit)
+        await crud.list_posts(session, limit=settings.posts_page_size)
+        await crud.list_tags(session)
+    semaphore = asyncio.Semaphore(8)
+    loaded_bytes = 0
+    loaded = 0
+
+    async def load(post: models.Post) -> None:
+        nonlocal loaded_bytes, loaded
+        async with semaphore:
+            # stop before the byte budget would evict bodies loaded moments ago
+            if loaded_bytes >= settings.content_cache_max_bytes:
+                return
+            try:
+                entry = await markdown_cache.get_entry(post.content_path)
+            except FileNotFoundError:
+                return
+            loaded_bytes += entry.size
+            loaded += 1
+
+    await asyncio.gather(*(load(post) for post in posts))
+    if settings.listing_snapshot_enabled:
+        await listing_snapshot.rebuild()
+    return len(posts), loaded
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    await init_db()
+    started = time.perf_counter()
+    phase_started = started
+    from_version, to_version = await migrate()
+    startup_timings["migrate"] = time.perf_counter() - phase_started
+    phase_started = time.perf_counter()
+    async with AsyncSessionFactory() as session:
+        await search_index.sync(session)
+    startup_timings["search_index"] = time.perf_counter() - phase_started
+    phase_started = time.perf_counter()
+    await sync_revocations(full=True)
+    startup_timings["revocations"] = time.perf_counter() - phase_started
+    if settings.startup_warmup:
+        phase_started = time.perf_counter()
+        posts, bodies = await warm_up(settings.startup_warmup_posts)
+        startup_timings["warmup"] = time.perf_counter() - phase_started
+        logger.info("warm-up cached %d posts and %d Markdown bodies", posts, bodies)
+    startup_timings["total"] = time.perf_counter() - started
+    logger.info(
+        "startup finished in %.3fs (schema v%d -> v%d; %s)",
+        startup_timings["total"],
+        from_version,
+        to_version,
+        ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in startup_timings.items()),
+    )
+    background_tasks.add(
+        asyncio.create_task(flush_periodically(settings.search_index_flush_seconds))
+    )
+    background_tasks.add(
+        asyncio.create_task(sync_periodically(settings.search_index_sync_seconds))
+    )
+    background_tasks.add(
+        asyncio.create_task(
+            refresh_periodically(
+                settings.token_revocation_poll_seconds,
+                settings.token_revocation_resync_seconds,
+            )
+        )
+    )
+    if settings.content_watch:
+        background_tasks.add(asyncio.create_task(content_watcher.run()))
+    if settings.listing_snapshot_enabled:
+        background_tasks.add(
+            asyncio.create_task(
+                listing_snapshot.run(
+                    settings.listing_snapshot_debounce_seconds,
+                    settings.listing_snapshot_poll_seconds,
+                )
+            )
+        )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
-    session: AsyncSession = Depends(get_session),
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await search_index.save()
+    await engine.dispose()
+    await replica_router.dispose()
+
+
+def read_preference(credentials: HTTPAuthorizationCredentials | None) -> bool:
+    try:
+        token = get_token_from_credentials(credentials)
+        if token:
+            return prefers_primary(decode_token(token))
+    except HTTPException:
+        # invalid credentials are reported by the user dependencies
+        pass
+    return False
+
+
+async def get_read_session(
+    credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme),
+) -> AsyncIterator[AsyncSession]:
+    session = await open_read_session(read_preference(credentials))
+    async with session:
+        yield session
+
+
+async def load_current_user(
+    credentials: HTTPAuthorizationCredentials | None, session: AsyncSession
 ) -> models.User:
     token = get_token_from_credentials(credentials)
     if not token:
@@ -52,7 +254,7 @@ async def get_current_user(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="凭证无效"
         )
-    user = await session.get(models.User, int(user_id))
+    user = await crud.get_user(session, int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="用户不存在或已被移除"
@@ -60,40 +262,79 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
+    session: AsyncSession = Depends(get_session),
+) -> models.User:
+    return await load_current_user(credentials, session)
+
+
+async def get_current_reader(
+    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
+    session: AsyncSession = Depends(get_read_session),
+) -> models.User:
+    # read-only variant for handlers that never write the user back
+    return await load_current_user(credentials, session)
+
+
 async def get_optional_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme),
-    session: AsyncSession = Depends(get_session),
-) -> models.User | None:
+    session: AsyncSession = Depends(get_read_session),
+) -> models.User | TokenUser | None:
     token = get_token_from_credentials(credentials)
     if not token:
         return None
     payload = decode_token(token)
+    token_user = user_from_claims(payload)
+    if token_user is not None:
+        return token_user
     user_id = payload.get("sub")
     if not user_id:
         return None
-    user = await session.get(models.User, int(user_id))
-    return user
+    # tokens issued before role claims existed still need a lookup
+    return await crud.get_user(session, int(user_id))
 
 
-def is_membership_active(user: models.User) -> bool:
+def is_membership_active(user: models.User | TokenUser) -> bool:
     if user.role in {"admin"}:
         return True
     if user.role != "member":
         return False
     if user.membership_expires_at is None:
         return True
-    return user.membership_expires_at > datetime.now(timezone.utc)
+    return as_utc(user.membership_expires_at) > datetime.now(timezone.utc)
 
 
-def read_markdown_content(content_path: str) -> str:
-    path = PathlibPath(content_path)
-    if not path.is_absolute():
-        path = CONTENT_DIR / content_path
-    if not path.exists():
+async def get_admin_user(
+    current_user: models.User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> models.User:
+    # admin rights are re-checked against the database, not the user cache
+    current_user = await crud.get_user(session, current_user.id, cached=False)
+    if current_user is None or current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="需要管理员权限"
+        )
+    return current_user
+
+
+async def read_markdown_content(content_path: str) -> str:
+    try:
+        return await markdown_cache.get(content_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="文章正文不存在"
+        )
+
+
+async def read_rendered_content(content_path: str) -> str:
+    try:
+        entry = await markdown_cache.get_entry(content_path)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="文章正文不存在"
         )
-    return path.read_text(encoding="utf-8")
+    return await render_cache.get(content_path, entry)
 
 
 @app.post("/api/auth/register")
@@ -106,12 +347,10 @@ async def register(
     user = await crud.create_user(
         session=session,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
         role="user",
     )
-    token = create_access_token(
-        subject=str(user.id), expires_minutes=settings.access_token_expire_minutes
-    )
+    token = create_user_token(user, read_your_writes=True)
     return {
         "access_token": token,
         "token_type": "bearer",
@@ -124,11 +363,16 @@ async def login(
     payload: schemas.UserLogin, session: AsyncSession = Depends(get_session)
 ):
     user = await crud.get_user_by_email(session, payload.email)
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user or not await verify_password_async(
+        payload.password, user.password_hash
+    ):
         raise HTTPException(status_code=401, detail="用户名或密码错误")
-    token = create_access_token(
-        subject=str(user.id), expires_minutes=settings.access_token_expire_minutes
-    )
+    if needs_rehash(user.password_hash):
+        # upgrade legacy or outdated hashes while the plaintext is at hand
+        user = await crud.update_password_hash(
+            session, user, await hash_password_async(payload.password)
+        )
+    token = create_user_token(user)
     return {
         "access_token": token,
         "token_type": "bearer",
@@ -136,34 +380,140 @@ async def login(
     }
 
 
+@app.post("/api/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme),
+):
+    token = get_token_from_credentials(credentials)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="需要登录后才能退出"
+        )
+    payload = decode_token(token)
+    if not payload.get("jti"):
+        # issued before jti existed; such tokens can only run out
+        raise HTTPException(status_code=400, detail="该凭证不支持注销，请等待其过期")
+    user_id = payload.get("sub")
+    await revoke(payload["jti"], int(user_id) if user_id else None, payload["exp"])
+    token_cache.pop(token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @app.get("/api/auth/me", response_model=schemas.UserOut)
-async def get_me(current_user: models.User = Depends(get_current_user)):
+async def get_me(current_user: models.User = Depends(get_current_reader)):
     return schemas.UserOut.model_validate(current_user)
 
 
-@app.post("/api/auth/upgrade", response_model=schemas.UserOut)
+@app.post("/api/auth/upgrade")
 async def upgrade_membership(
     current_user: models.User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     expires_at = datetime.now(timezone.utc) + timedelta(days=30)
     updated = await crud.upgrade_membership(session, current_user, expires_at)
-    return schemas.UserOut.model_validate(updated)
+    # the old token still carries the previous role/membership claims
+    return {
+        "access_token": create_user_token(updated, read_your_writes=True),
+        "token_type": "bearer",
+        "user": schemas.UserOut.model_validate(updated),
+    }
 
 
-@app.get("/api/posts", response_model=list[schemas.PostOut])
-async def list_posts(session: AsyncSession = Depends(get_session)):
-    posts = await crud.list_posts(session)
-    return [schemas.PostOut.model_validate(post) for post in posts]
+def listing_snapshot_response(request: Request, page: SnapshotPage) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), list(page.encoded))
+    etag = coded_etag(page.etag, encoding)
+    headers = validator_headers(etag, None, "public, no-cache")
+    headers["X-Listing-Version"] = page.version
+    headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request, etag, None):
+        return not_modified(headers)
+    body = page.body
+    if encoding is not None:
+        body = page.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
-@app.get("/api/posts/{post_id}", response_model=schemas.PostDetail)
-async def get_post(
-    post_id: int = Path(..., gt=0),
-    session: AsyncSession = Depends(get_session),
-    current_user: models.User | None = Depends(get_optional_user),
+@app.get("/api/posts", response_model=schemas.PostPage)
+async def list_posts(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=settings.posts_page_max_size),
+    cursor: str | None = None,
+    tag: str | None = None,
+    visibility: str | None = None,
+    credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme),
 ):
-    db_post = await crud.get_post(session, post_id)
+    position = None
+    if cursor:
+        try:
+            position = crud.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="分页游标无效")
+    limit = limit or settings.posts_page_size
+    if tag is None and visibility is None and limit == listing_snapshot.page_size:
+        # the first pages are prebuilt bytes: no session, no query, no serialization
+        page = listing_snapshot.get(cursor)
+        if page is not None:
+            return listing_snapshot_response(request, page)
+    session = await open_read_session(read_preference(credentials))
+    async with session:
+        latest, total = await crud.posts_version(session, tag=tag, visibility=visibility)
+        etag = make_etag("posts", latest, total, limit, cursor, tag, visibility)
+        # no Last-Modified: max(updated_at) stays put when a post is deleted, so only
+        # the ETag (which also covers the row count) can validate a list
+        headers = validator_headers(etag, None, "public, no-cache")
+        headers["X-Listing-Version"] = listing_version(latest, total)
+        if is_not_modified(request, etag, None):
+            return not_modified(headers)
+        items, next_cursor = await crud.list_posts(
+            session,
+            limit=limit,
+            cursor=position,
+            tag=tag,
+            visibility=visibility,
+        )
+    # one validation pass over plain dicts, serialized by pydantic-core directly;
+    # returning a Response skips FastAPI's second validate + jsonable_encoder pass
+    page = schemas.PostPage.model_validate({"items": items, "next_cursor": next_cursor})
+    return Response(
+        content=page.model_dump_json(),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@app.get("/api/tags", response_model=list[schemas.TagOut])
+async def list_tags(session: AsyncSession = Depends(get_read_session)):
+    tags = await crud.list_tags(session)
+    return [schemas.TagOut.model_validate(tag) for tag in tags]
+
+
+@app.get("/api/search", response_model=schemas.SearchPage)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=settings.posts_page_max_size),
+    session: AsyncSession = Depends(get_read_session),
+):
+    if not search_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="搜索索引尚未就绪"
+        )
+    total, hits = search_index.search(q, offset=offset, limit=limit)
+    posts = await crud.get_posts_by_ids(session, [post_id for post_id, _ in hits])
+    items = [
+        schemas.SearchHit.model_validate(
+            {**schemas.PostOut.model_validate(posts[post_id]).model_dump(), "score": score}
+        )
+        for post_id, score in hits
+        if post_id in posts
+    ]
+    return schemas.SearchPage(items=items, total=total, offset=offset, limit=limit)
+
+
+def authorize_post(
+    db_post: models.Post | None, current_user: models.User | TokenUser | None
+) -> models.Post:
     if not db_post:
         raise HTTPException(status_code=404, detail="文章不存在")
     if current_user is None:
@@ -175,31 +525,309 @@ async def get_post(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="会员可查看，升级后继续阅读",
         )
-    content = read_markdown_content(db_post.content_path)
+    return db_post
+
+
+async def build_post_detail(
+    db_post: models.Post | None,
+    current_user: models.User | TokenUser | None,
+    request: Request,
+    response: Response,
+    content_format: str = "markdown",
+):
+    db_post = authorize_post(db_post, current_user)
+    try:
+        mtime_ns, size = await markdown_cache.stat(db_post.content_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="文章正文不存在"
+        )
+    content_modified = datetime.fromtimestamp(mtime_ns / 1e9, tz=timezone.utc)
+    last_modified = max(as_utc(db_post.updated_at), content_modified)
+    etag = make_etag(
+        "post", content_format, db_post.id, db_post.updated_at, mtime_ns, size
+    )
+    headers = validator_headers(etag, last_modified, "private, no-cache")
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(headers)
+    payload = await post_detail_payload(request, db_post, content_format)
+    response.headers.update(headers)
+    return payload
+
+
+async def post_detail_payload(
+    request: Request, db_post: models.Post, content_format: str
+) -> schemas.PostDetail:
     payload = schemas.PostDetail.model_validate(db_post)
-    payload.content = content
+    if content_format == "url":
+        # metadata only; the body is fetched (or range-loaded) from the raw endpoint
+        payload.content_url = request.app.url_path_for(
+            "get_post_content_by_id", post_id=str(db_post.id)
+        )
+    elif content_format == "html":
+        payload.html = await read_rendered_content(db_post.content_path)
+    else:
+        payload.content = await read_markdown_content(db_post.content_path)
     return payload
 
 
+async def batch_item(
+    request: Request,
+    key: str,
+    db_post: models.Post | None,
+    current_user: models.User | TokenUser | None,
+    content_format: str,
+) -> schemas.PostBatchItem:
+    try:
+        db_post = authorize_post(db_post, current_user)
+        post = await post_detail_payload(request, db_post, content_format)
+    except HTTPException as error:
+        return schemas.PostBatchItem(key=key, status=error.status_code, detail=error.detail)
+    return schemas.PostBatchItem(key=key, status=status.HTTP_200_OK, post=post)
+
+
+@app.post("/api/posts/batch", response_model=schemas.PostBatchResponse)
+async def get_posts_batch(
+    payload: schemas.PostBatchRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: models.User | TokenUser | None = Depends(get_optional_user),
+):
+    slugs = list(dict.fromkeys(payload.slugs))
+    post_ids = list(dict.fromkeys(payload.ids))
+    by_id, by_slug = await crud.get_posts_batch(session, post_ids, slugs)
+    requested = [(slug, by_slug.get(slug)) for slug in slugs] + [
+        (str(post_id), by_id.get(post_id)) for post_id in post_ids
+    ]
+    # the caller is resolved once by the dependency; bodies are read concurrently
+    items = await asyncio.gather(
+        *(
+            batch_item(request, key, db_post, current_user, payload.format)
+            for key, db_post in requested
+        )
+    )
+    return schemas.PostBatchResponse(items=list(items))
+
+
+@app.get("/api/posts/{post_id}", response_model=schemas.PostDetail)
+async def get_post(
+    request: Request,
+    response: Response,
+    post_id: int = Path(..., gt=0),
+    content_format: str = Query("markdown", alias="format", pattern="^(markdown|html|url)$"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: models.User | TokenUser | None = Depends(get_optional_user),
+):
+    db_post = await crud.get_post(session, post_id)
+    return await build_post_detail(
+        db_post, current_user, request, response, content_format
+    )
+
+
 @app.get("/api/posts/slug/{slug}", response_model=schemas.PostDetail)
 async def get_post_by_slug(
     slug: str,
-    session: AsyncSession = Depends(get_session),
-    current_user: models.User | None = Depends(get_optional_user),
+    request: Request,
+    response: Response,
+    content_format: str = Query("markdown", alias="format", pattern="^(markdown|html|url)$"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: models.User | TokenUser | None = Depends(get_optional_user),
 ):
+    db_post = await crud.get_post_by_slug(session, slug)
+    return await build_post_detail(
+        db_post, current_user, request, response, content_format
+    )
+
+
+@app.get("/api/posts/slug/{slug}/meta", response_model=schemas.PostOut)
+async def get_post_meta_by_slug(
+    slug: str, session: AsyncSession = Depends(get_read_session)
+):
+    # list metadata is public, so locked posts can still show their title and excerpt
     db_post = await crud.get_post_by_slug(session, slug)
     if not db_post:
         raise HTTPException(status_code=404, detail="文章不存在")
-    if current_user is None:
+    return schemas.PostOut.model_validate(db_post)
+
+
+def accel_redirect_path(path: FilePath) -> str | None:
+    # let a fronting nginx send the file itself (sendfile, Range) via X-Accel-Redirect
+    prefix = settings.content_accel_redirect_prefix.rstrip("/")
+    if not prefix:
+        return None
+    try:
+        relative = path.resolve().relative_to(CONTENT_DIR.resolve())
+    except ValueError:
+        return None
+    return f"{prefix}/{quote(relative.as_posix())}"
+
+
+async def send_post_content(request: Request, db_post: models.Post) -> Response:
+    try:
+        entry = await markdown_cache.get_entry(db_post.content_path)
+    except FileNotFoundError:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="需要登录后才能查看全文"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="文章正文不存在"
         )
-    if db_post.visibility == "member" and not is_membership_active(current_user):
+    path = resolve_content_path(db_post.content_path)
+    # byte ranges always address the identity (uncompressed) Markdown
+    encoding = (
+        None
+        if "range" in request.headers
+        else negotiate_encoding(
+            request.headers.get("accept-encoding"), available_encodings()
+        )
+    )
+    variant = (
+        await find_variant(db_post.content_path, entry.digest, encoding)
+        if encoding
+        else None
+    )
+    if variant is None:
+        encoding = None
+    # one validator per representation: If-Range must never splice identity bytes
+    # onto a gzip/br prefix
+    etag = coded_etag(make_etag("content", entry.digest), encoding)
+    headers = validator_headers(etag, None, "private, no-cache")
+    headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request, etag, None):
+        return not_modified(headers)
+    media_type = "text/markdown; charset=utf-8"
+    if variant is not None:
+        headers["Content-Encoding"] = encoding
+        path = variant
+    accel_path = accel_redirect_path(path)
+    if accel_path is not None:
+        headers["X-Accel-Redirect"] = accel_path
+        return Response(media_type=media_type, headers=headers)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="会员可查看，升级后继续阅读",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="文章正文不存在"
         )
-    content = read_markdown_content(db_post.content_path)
-    payload = schemas.PostDetail.model_validate(db_post)
-    payload.content = content
-    return payload
+    try:
+        byte_range = (
+            parse_byte_range(request, etag, stat_result.st_size)
+            if variant is None
+            else None
+        )
+    except RangeNotSatisfiable:
+        return range_not_satisfiable(stat_result.st_size, headers)
+    return RangeFileResponse(
+        path, stat_result, byte_range, media_type=media_type, headers=headers
+    )
+
+
+@app.get("/api/posts/{post_id}/content")
+async def get_post_content_by_id(
+    request: Request,
+    post_id: int = Path(..., gt=0),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: models.User | TokenUser | None = Depends(get_optional_user),
+):
+    db_post = authorize_post(await crud.get_post(session, post_id), current_user)
+    return await send_post_content(request, db_post)
+
+
+@app.get("/api/posts/slug/{slug}/content")
+async def get_post_content(
+    slug: str,
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: models.User | TokenUser | None = Depends(get_optional_user),
+):
+    db_post = authorize_post(
+        await crud.get_post_by_slug(session, slug), current_user
+    )
+    return await send_post_content(request, db_post)
+
+
+async def run_bulk(session: AsyncSession, operation, *args):
+    try:
+        return await operation(session, *args)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="批量操作与现有数据冲突，已全部回滚"
+        )
+
+
+@app.post("/api/admin/posts/bulk-create", response_model=list[schemas.BulkItemResult])
+async def bulk_create_posts(
+    payload: schemas.PostBulkCreate,
+    admin: models.User = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_session),
+):
+    return await run_bulk(session, crud.bulk_create_posts, payload.items)
+
+
+@app.post("/api/admin/posts/bulk-update", response_model=list[schemas.BulkItemResult])
+async def bulk_update_posts(
+    payload: schemas.PostBulkUpdate,
+    admin: models.User = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_session),
+):
+    return await run_bulk(session, crud.bulk_update_posts, payload.items)
+
+
+@app.post("/api/admin/posts/bulk-delete", response_model=list[schemas.BulkItemResult])
+async def bulk_delete_posts(
+    payload: schemas.PostBulkDelete,
+    admin: models.User = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_session),
+):
+    return await run_bulk(session, crud.bulk_delete_posts, payload.slugs)
+
+
+@app.post("/api/admin/posts/visibility", response_model=list[schemas.BulkItemResult])
+async def bulk_set_visibility(
+    payload: schemas.PostBulkVisibility,
+    admin: models.User = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_session),
+):
+    return await run_bulk(
+        session, crud.bulk_set_visibility, payload.slugs, payload.visibility
+    )
+
+
+@app.get("/api/admin/db-pool")
+async def get_pool_stats(admin: models.User = Depends(get_admin_user)):
+    return {
+        **pool_snapshot(engine),
+        "replicas": replica_router.snapshot(),
+        "replica_fallbacks": replica_router.fallbacks,
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(
+    credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme),
+):
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_token and (
+        credentials is None
+        or not hmac.compare_digest(credentials.credentials, settings.metrics_token)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="需要有效的指标访问令牌",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/api/admin/cache")
+async def get_cache_stats(admin: models.User = Depends(get_admin_user)):
+    return {
+        "markdown": markdown_cache.stats(),
+        "render": render_cache.stats(),
+        "posts": crud.post_cache.stats(),
+        "search": search_index.stats(),
+        "listing": listing_snapshot.stats(),
+        "singleflight": {flight.name: flight.stats() for flight in flights},
+        "revocations": revoked_tokens.stats(),
+    }
@@ -0,0 +1,277 @@
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Sample = tuple[str, dict[str, str], float]
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for key, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [non-cumulative bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = ([0] * (len(self.buckets) + 1), [0.0])
+            self._series[labels] = series
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, (counts, total) in self._series.items():
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**base, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", base, total[0]
+            yield f"{self.name}_count", base, cumulative
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+        # collectors are evaluated at scrape time, so existing stats() cost nothing per request
+        self._collectors: list[tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(
+        self, name: str, kind: str, documentation: str, collect: Callable[[], Iterable[Sample]]
+    ) -> None:
+        self._collectors.append((name, kind, documentation, collect))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        families = [
+            (metric.name, metric.kind, metric.documentation, metric.samples)
+            for metric in self._metrics
+        ] + self._collectors
+        for name, kind, documentation, collect in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in collect():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "mai_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+db_query_duration = registry.histogram(
+    "mai_db_query_duration_seconds",
+    "SQL statement execution time",
+    ("database", "operation"),
+)
+content_io_duration = registry.histogram(
+    "mai_content_io_duration_seconds",
+    "Markdown file read/stat time",
+    ("operation",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+token_decode_duration = registry.histogram(
+    "mai_token_decode_duration_seconds",
+    "JWT signature verification time on token cache misses",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+
+
+def instrument_engine(sync_engine, database: str) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("mai_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info["mai_query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        db_query_duration.observe(time.perf_counter() - started, database, operation)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context) -> None:
+        connection = context.connection
+        if connection is not None and connection.info.get("mai_query_started"):
+            connection.info["mai_query_started"].pop()
+
+
+def cache_collectors(caches: dict[str, Callable[[], dict]]) -> None:
+    def collect_counter(field: str) -> Callable[[], Iterable[Sample]]:
+        def collect() -> Iterable[Sample]:
+            for name, stats in caches.items():
+                value = stats().get(field)
+                if value is not None:
+                    yield f"mai_cache_{field}_total", {"cache": name}, value
+
+        return collect
+
+    def collect_entries() -> Iterable[Sample]:
+        for name, stats in caches.items():
+            yield "mai_cache_entries", {"cache": name}, stats().get("entries", 0)
+
+    def collect_ratio() -> Iterable[Sample]:
+        for name, stats in caches.items():
+            snapshot = stats()
+            hits = snapshot.get("hits", 0) + snapshot.get("disk_hits", 0)
+            lookups = hits + snapshot.get("misses", snapshot.get("renders", 0))
+            yield "mai_cache_hit_ratio", {"cache": name}, hits / lookups if lookups else 0.0
+
+    registry.collector("mai_cache_hits_total", "counter", "Cache hits", collect_counter("hits"))
+    registry.collector("mai_cache_misses_total", "counter", "Cache misses", collect_counter("misses"))
+    registry.collector(
+        "mai_cache_evictions_total", "counter", "Cache evictions", collect_counter("evictions")
+    )
+    registry.collector("mai_cache_entries", "gauge", "Cached entries", collect_entries)
+    registry.collector(
+        "mai_cache_hit_ratio", "gauge", "Hits / lookups since start", collect_ratio
+    )
+
+
+def singleflight_collectors(flights: Iterable) -> None:
+    def collect(name: str, field: str) -> Callable[[], Iterable[Sample]]:
+        def collect_field() -> Iterable[Sample]:
+            for flight in flights:
+                yield name, {"flight": flight.name}, flight.stats()[field]
+
+        return collect_field
+
+    for name, field, kind, documentation in (
+        ("mai_singleflight_loads_total", "loads", "counter", "Loads actually executed"),
+        (
+            "mai_singleflight_coalesced_total",
+            "coalesced",
+            "counter",
+            "Callers that joined an in-flight load",
+        ),
+        (
+            "mai_singleflight_refreshes_total",
+            "refreshes",
+            "counter",
+            "Background early refreshes started",
+        ),
+        ("mai_singleflight_errors_total", "errors", "counter", "Loads that raised"),
+        ("mai_singleflight_in_flight", "in_flight", "gauge", "Loads currently running"),
+    ):
+        registry.collector(name, kind, documentation, collect(name, field))
+
+
+class MetricsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # route templates keep label cardinality bounded
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
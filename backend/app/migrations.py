@@ -0,0 +1,219 @@
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from . import models  # registers every table on Base.metadata
+from .database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "mai_schema_migrations"
+LOCK_TIMEOUT_SECONDS = 120
+
+# kept off Base.metadata so the baseline create_all never depends on it
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(128), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+
+
+async def _baseline(conn: AsyncConnection) -> None:
+    # checkfirst skips tables that already exist, and with them any index added to
+    # such a table later; those indexes get their own migrations below
+    await conn.run_sync(Base.metadata.create_all)
+
+
+async def _posts_keyset_indexes(conn: AsyncConnection) -> None:
+    # posts tables created by the original init_db predate these
+    for index in models.Post.__table__.indexes:
+        if index.name in {"ix_posts_created_at_id", "ix_posts_visibility_created_at_id"}:
+            await conn.run_sync(index.create, checkfirst=True)
+
+
+def _split_tags(value: str | None) -> list[str]:
+    # frozen copy of crud.split_tags as of this migration
+    names: list[str] = []
+    for item in (value or "").split(","):
+        name = item.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+async def backfill_post_tags(conn: AsyncConnection) -> tuple[int, int]:
+    # make post_tags match the comma-joined posts.tags strings, then recount tags
+    posts = models.Post.__table__
+    tags = models.Tag.__table__
+    post_tags = models.PostTag.__table__
+    wanted = {
+        post_id: _split_tags(value)
+        for post_id, value in (await conn.execute(select(posts.c.id, posts.c.tags))).all()
+    }
+    names = {name for post_names in wanted.values() for name in post_names}
+    tag_ids = dict((await conn.execute(select(tags.c.name, tags.c.id))).all())
+    missing = sorted(names - tag_ids.keys())
+    if missing:
+        await conn.execute(
+            insert(tags), [{"name": name, "post_count": 0} for name in missing]
+        )
+        tag_ids = dict((await conn.execute(select(tags.c.name, tags.c.id))).all())
+    desired = {
+        (post_id, tag_ids[name])
+        for post_id, post_names in wanted.items()
+        for name in post_names
+    }
+    existing = set(
+        (await conn.execute(select(post_tags.c.post_id, post_tags.c.tag_id))).all()
+    )
+    stale = existing - desired
+    if stale:
+        await conn.execute(
+            delete(post_tags).where(
+                tuple_(post_tags.c.post_id, post_tags.c.tag_id).in_(sorted(stale))
+            )
+        )
+    added = desired - existing
+    if added:
+        await conn.execute(
+            insert(post_tags),
+            [{"post_id": post_id, "tag_id": tag_id} for post_id, tag_id in sorted(added)],
+        )
+    # recount from scratch so counts are exact even after partial earlier runs
+    counts = (
+        select(func.count(post_tags.c.post_id))
+        .where(post_tags.c.tag_id == tags.c.id)
+        .scalar_subquery()
+    )
+    await conn.execute(update(tags).values(post_count=counts))
+    return len(wanted), len(tag_ids)
+
+
+async def _post_tags_backfill(conn: AsyncConnection) -> None:
+    await backfill_post_tags(conn)
+
+
+async def _revoked_tokens(conn: AsyncConnection) -> None:
+    # fresh databases already got the table from the baseline's create_all
+    await conn.run_sync(models.RevokedToken.__table__.create, checkfirst=True)
+
+
+# append only; never edit a migration that has shipped
+MIGRATIONS: list[Migration] = [
+    Migration(1, "baseline schema (posts, tags, post_tags, users)", _baseline),
+    Migration(2, "revoked_tokens for logout", _revoked_tokens),
+    Migration(3, "posts keyset pagination indexes", _posts_keyset_indexes),
+    Migration(4, "backfill post_tags from posts.tags", _post_tags_backfill),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def _current_version(conn: AsyncConnection) -> int:
+    return await conn.scalar(select(func.max(schema_version.c.version))) or 0
+
+
+async def read_version(db_engine: AsyncEngine = engine) -> int:
+    try:
+        async with db_engine.connect() as conn:
+            return await _current_version(conn)
+    except DBAPIError:
+        # schema_version does not exist yet
+        return 0
+
+
+@asynccontextmanager
+async def named_lock(
+    conn: AsyncConnection, name: str, timeout: float
+) -> AsyncIterator[bool | None]:
+    # session-level locks survive the implicit commits MySQL issues around DDL;
+    # timeout 0 tries once. Yields None on dialects without named locks
+    dialect = conn.dialect.name
+    params = {"name": name, "timeout": timeout}
+    if dialect in {"mysql", "mariadb"}:
+        acquired = await conn.scalar(text("SELECT GET_LOCK(:name, :timeout)"), params) == 1
+        release = "SELECT RELEASE_LOCK(:name)"
+    elif dialect == "postgresql":
+        if timeout:
+            await conn.execute(text("SELECT pg_advisory_lock(hashtext(:name))"), params)
+            acquired = True
+        else:
+            acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(hashtext(:name))"), params
+            )
+        release = "SELECT pg_advisory_unlock(hashtext(:name))"
+    else:
+        yield None
+        return
+    await conn.commit()
+    if not acquired:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        await conn.execute(text(release), params)
+        await conn.commit()
+
+
+@asynccontextmanager
+async def migration_lock(conn: AsyncConnection) -> AsyncIterator[None]:
+    async with named_lock(conn, LOCK_NAME, LOCK_TIMEOUT_SECONDS) as acquired:
+        if acquired is False:
+            raise RuntimeError("等待数据库迁移锁超时")
+        # SQLite serializes writers on the database file, and every step is idempotent
+        yield
+
+
+async def migrate(db_engine: AsyncEngine = engine) -> tuple[int, int]:
+    # the common boot path: one SELECT, nothing to do
+    version = await read_version(db_engine)
+    if version >= LATEST_VERSION:
+        return version, version
+    async with db_engine.connect() as conn:
+        async with migration_lock(conn):
+            await conn.run_sync(version_metadata.create_all)
+            await conn.commit()
+            # another worker may have migrated while we waited for the lock
+            start = version = await _current_version(conn)
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                logger.info("applying migration %s: %s", migration.version, migration.name)
+                await migration.apply(conn)
+                await conn.execute(
+                    insert(schema_version).values(
+                        version=migration.version, name=migration.name
+                    )
+                )
+                await conn.commit()
+                version = migration.version
+    return start, version
@@ -0,0 +1,181 @@
+import asyncio
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import re
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+
+from . import crud
+from .config import settings
+from .database import AsyncSessionFactory
+from .security import decode_token
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_MODES = {"1", "true", "file", "download", "text"}
+TEXT_LIMIT = 60
+
+
+
+def requested_mode(scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            mode = value.decode("latin-1").strip().lower()
+            return mode if mode in PROFILE_MODES else None
+    query_string = scope.get("query_string", b"")
+    if b"profile=" not in query_string:
+        return None
+    values = parse_qs(query_string.decode("latin-1")).get("profile")
+    mode = values[0].strip().lower() if values else ""
+    return mode if mode in PROFILE_MODES else None
+
+
+async def is_admin(scope) -> bool:
+    authorization = next(
+        (value for name, value in scope["headers"] if name == b"authorization"), b""
+    ).decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = decode_token(token.strip())
+    except HTTPException:
+        return False
+    if payload.get("role", "admin") != "admin" or not payload.get("sub"):
+        return False
+    async with AsyncSessionFactory() as session:
+        user = await crud.get_user(session, int(payload["sub"]), cached=False)
+    return user is not None and user.role == "admin"
+
+
+def profile_filename(scope) -> str:
+    route = re.sub(r"[^A-Za-z0-9_-]+", "_", scope["path"]).strip("_") or "root"
+    return f"{int(time.time() * 1000)}-{scope['method']}-{route}.prof"
+
+
+def dump_stats(profiler: cProfile.Profile) -> bytes:
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def format_stats(profiler: cProfile.Profile) -> str:
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TEXT_LIMIT)
+    return buffer.getvalue()
+
+
+def write_profile(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+class ProfiledSteps:
+    # drives a coroutine with the profiler on only while that coroutine runs;
+    # whatever else the loop runs between its awaits stays out of the profile,
+    # and profiled requests no longer need to take turns
+    def __init__(self, coroutine, profiler: cProfile.Profile) -> None:
+        self.coroutine = coroutine
+        self.profiler = profiler
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            self.profiler.enable()
+            try:
+                if error is not None:
+                    yielded = self.coroutine.throw(error)
+                else:
+                    yielded = self.coroutine.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profiler.disable()
+            try:
+                value, error = (yield yielded), None
+            except BaseException as exc:
+                value, error = None, exc
+
+
+async def send_body(send, status_code: int, body: bytes, headers: list) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-length", str(len(body)).encode()), *headers],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class ProfilerMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if not await is_admin(scope):
+            body = json.dumps({"detail": "需要管理员权限"}, ensure_ascii=False).encode()
+            await send_body(
+                send, 403, body, [(b"content-type", b"application/json")]
+            )
+            return
+
+        filename = profile_filename(scope)
+        buffered = mode in {"download", "text"}
+        profile_path = Path(settings.profile_dir) / filename
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if not buffered:
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"x-profile-file", filename.encode()),
+                        ],
+                    }
+            if not buffered:
+                await send(message)
+
+        profiler = cProfile.Profile()
+        await ProfiledSteps(self.app(scope, receive, send_wrapper), profiler)
+
+        original_status = [(b"x-profile-status", str(status_code).encode())]
+        if mode == "text":
+            await send_body(
+                send,
+                200,
+                format_stats(profiler).encode("utf-8"),
+                [(b"content-type", b"text/plain; charset=utf-8"), *original_status],
+            )
+        elif mode == "download":
+            await send_body(
+                send,
+                200,
+                dump_stats(profiler),
+                [
+                    (b"content-type", b"application/octet-stream"),
+                    (
+                        b"content-disposition",
+                        f'attachment; filename="{filename}"'.encode(),
+                    ),
+                    *original_status,
+                ],
+            )
+        else:
+            await asyncio.to_thread(write_profile, profile_path, dump_stats(profiler))
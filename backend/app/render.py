@@ -0,0 +1,143 @@
+import asyncio
+import html
+from collections import OrderedDict
+from pathlib import Path
+
+import nh3
+from markdown_it import MarkdownIt
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+from .config import settings
+from .content import CachedMarkdown, content_digest, resolve_content_path
+from .singleflight import SingleFlight
+
+_formatter = HtmlFormatter(nowrap=True)
+
+ALLOWED_ATTRIBUTES = {
+    **nh3.ALLOWED_ATTRIBUTES,
+    "code": {"class"},
+    "div": {"class"},
+    "pre": {"class"},
+    "span": {"class"},
+}
+
+
+def _highlight(code: str, lang: str, attrs: str) -> str:
+    try:
+        lexer = get_lexer_by_name(lang) if lang else None
+    except ClassNotFound:
+        lexer = None
+    if lexer is None:
+        return ""
+    body = highlight(code, lexer, _formatter)
+    language = html.escape(lang, quote=True)
+    return f'<pre class="highlight"><code class="language-{language}">{body}</code></pre>\n'
+
+
+_markdown = (
+    MarkdownIt("commonmark", {"html": True, "typographer": True, "highlight": _highlight})
+    .enable("table")
+    .enable("strikethrough")
+)
+
+
+def render_markdown(text: str) -> str:
+    return nh3.clean(_markdown.render(text), attributes=ALLOWED_ATTRIBUTES)
+
+
+def rendered_path(path: Path, digest: str) -> Path:
+    return path.with_name(f"{path.name}.{digest}.html")
+
+
+def write_rendered(path: Path) -> Path:
+    # warm the on-disk render cache at import time
+    data = path.read_bytes()
+    target = rendered_path(path, content_digest(data))
+    if not target.exists():
+        tmp = target.with_name(f"{target.name}.tmp")
+        tmp.write_text(render_markdown(data.decode("utf-8")), encoding="utf-8")
+        tmp.replace(target)
+    for stale in path.parent.glob(f"{path.name}.*.html"):
+        if stale != target:
+            stale.unlink(missing_ok=True)
+    return target
+
+
+def _load_or_render(path: Path, text: str) -> tuple[str, bool]:
+    try:
+        return path.read_text(encoding="utf-8"), True
+    except FileNotFoundError:
+        pass
+    rendered = render_markdown(text)
+    try:
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(rendered, encoding="utf-8")
+        tmp.replace(path)
+    except OSError:
+        pass
+    return rendered, False
+
+
+class RenderCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        self.evictions = 0
+        # keyed by digest: identical content is rendered once however many requests want it
+        self.flight: SingleFlight[str, str] = SingleFlight("render")
+
+    async def get(self, content_path: str, entry: CachedMarkdown) -> str:
+        rendered = self._entries.get(entry.digest)
+        if rendered is not None:
+            self.hits += 1
+            self._entries.move_to_end(entry.digest)
+            return rendered
+        return await self.flight.do(
+            entry.digest, lambda: self._render(content_path, entry)
+        )
+
+    async def _render(self, content_path: str, entry: CachedMarkdown) -> str:
+        path = rendered_path(resolve_content_path(content_path), entry.digest)
+        rendered, from_disk = await asyncio.to_thread(_load_or_render, path, entry.text)
+        if from_disk:
+            self.disk_hits += 1
+        else:
+            self.renders += 1
+        self._store(entry.digest, rendered)
+        return rendered
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "renders": self.renders,
+            "evictions": self.evictions,
+        }
+
+    def _store(self, digest: str, rendered: str) -> None:
+        size = len(rendered.encode("utf-8"))
+        if size > self.max_bytes or digest in self._entries:
+            return
+        self._entries[digest] = rendered
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted.encode("utf-8"))
+            self.evictions += 1
+
+
+render_cache = RenderCache(max_bytes=settings.render_cache_max_bytes)
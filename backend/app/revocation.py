@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from . import crud
+from .database import AsyncSessionFactory
+from .http_cache import as_utc
+from .security import revoked_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _expiry(expires_at: datetime) -> float:
+    return as_utc(expires_at).timestamp()
+
+
+async def revoke(jti: str, user_id: int | None, exp: float) -> None:
+    async with AsyncSessionFactory() as session:
+        await crud.revoke_token(
+            session, jti, user_id, datetime.fromtimestamp(exp, tz=timezone.utc)
+        )
+    # this worker rejects the token at once; the others pick it up on their next poll
+    revoked_tokens.add(jti, exp)
+
+
+async def sync_revocations(full: bool = False) -> int:
+    # always the primary: a lagging replica would let a revoked token through for longer
+    async with AsyncSessionFactory() as session:
+        if full:
+            pruned = await crud.prune_revoked_tokens(session)
+            if pruned:
+                logger.info("pruned %d expired token revocations", pruned)
+        rows = await crud.list_revoked_tokens(
+            session, after_id=0 if full else revoked_tokens.last_id
+        )
+    if full:
+        # only unexpired rows are loaded, so this is also the in-memory prune
+        revoked_tokens.replace(
+            {jti: _expiry(expires_at) for _, jti, expires_at in rows},
+            max((row_id for row_id, _, _ in rows), default=0),
+        )
+    else:
+        for row_id, jti, expires_at in rows:
+            revoked_tokens.add(jti, _expiry(expires_at), row_id)
+    revoked_tokens.synced_at = time.time()
+    return len(rows)
+
+
+async def refresh_periodically(poll_seconds: float, resync_seconds: float) -> None:
+    last_full = time.monotonic()
+    while True:
+        await asyncio.sleep(poll_seconds)
+        # incremental polls go by id; an occasional full reload catches rows that
+        # committed out of id order and drops entries whose tokens have expired
+        full = time.monotonic() - last_full >= resync_seconds
+        try:
+            await sync_revocations(full=full)
+        except Exception:
+            logger.exception("refreshing token revocations failed")
+            continue
+        if full:
+            last_full = time.monotonic()
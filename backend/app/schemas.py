@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class PostBase(BaseModel):
@@ -47,6 +47,34 @@ class PostUpdate(BaseModel):
         return value
 
 
+class PostBulkCreate(BaseModel):
+    items: List[PostCreate] = Field(..., min_length=1, max_length=500)
+
+
+class PostBulkUpdateItem(BaseModel):
+    slug: str
+    changes: PostUpdate
+
+
+class PostBulkUpdate(BaseModel):
+    items: List[PostBulkUpdateItem] = Field(..., min_length=1, max_length=500)
+
+
+class PostBulkDelete(BaseModel):
+    slugs: List[str] = Field(..., min_length=1, max_length=500)
+
+
+class PostBulkVisibility(BaseModel):
+    slugs: List[str] = Field(..., min_length=1, max_length=500)
+    visibility: str = Field(..., pattern="^(registered|member)$")
+
+
+class BulkItemResult(BaseModel):
+    slug: Optional[str] = None
+    status: str
+    id: Optional[int] = None
+
+
 class PostOut(PostBase):
     id: int
     created_at: datetime
@@ -58,6 +86,58 @@ class PostOut(PostBase):
 
 class PostDetail(PostOut):
     content: str | None = None
+    html: str | None = None
+    content_url: str | None = None
+
+
+class PostBatchRequest(BaseModel):
+    slugs: List[str] = Field(default_factory=list, max_length=50)
+    ids: List[int] = Field(default_factory=list, max_length=50)
+    format: str = Field("markdown", pattern="^(markdown|html|url)$")
+
+    @model_validator(mode="after")
+    def check_size(self):
+        total = len(self.slugs) + len(self.ids)
+        if total == 0:
+            raise ValueError("slugs 与 ids 不能同时为空")
+        if total > 50:
+            raise ValueError("单次最多获取 50 篇文章")
+        return self
+
+
+class PostBatchItem(BaseModel):
+    key: str
+    status: int
+    detail: Optional[str] = None
+    post: Optional[PostDetail] = None
+
+
+class PostBatchResponse(BaseModel):
+    items: List[PostBatchItem]
+
+
+class PostPage(BaseModel):
+    items: List[PostOut]
+    next_cursor: Optional[str] = None
+
+
+class TagOut(BaseModel):
+    name: str
+    post_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class SearchHit(PostOut):
+    score: float
+
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    total: int
+    offset: int
+    limit: int
 
 
 class Token(BaseModel):
@@ -0,0 +1,293 @@
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .content import resolve_content_path
+from .database import AsyncSessionFactory
+
+CJK_RANGES = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+TOKEN_PATTERN = re.compile(rf"[{CJK_RANGES}]+|[0-9a-z]+")
+CJK_PATTERN = re.compile(rf"[{CJK_RANGES}]")
+
+FIELD_WEIGHTS = {"title": 3, "excerpt": 2, "body": 1}
+BM25_K1 = 1.2
+BM25_B = 0.75
+INDEX_FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str | None) -> list[str]:
+    # Latin runs become words, CJK runs become overlapping bigrams
+    if not text:
+        return []
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        run = match.group()
+        if CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def document_terms(title: str, excerpt: str | None, body: str) -> dict[str, int]:
+    counts: Counter[str] = Counter()
+    for field, text in (("title", title), ("excerpt", excerpt), ("body", body)):
+        weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text):
+            counts[token] += weight
+    return dict(counts)
+
+
+@dataclass(frozen=True)
+class IndexedDocument:
+    fingerprint: str
+    terms: dict[str, int]
+    length: int
+
+
+def _fingerprint(post: models.Post, stat: os.stat_result | None) -> str:
+    file_part = f"{stat.st_mtime_ns}:{stat.st_size}" if stat else "missing"
+    return f"{post.updated_at.isoformat()}|{post.content_path}|{file_part}"
+
+
+def _load_document(post: models.Post) -> IndexedDocument:
+    path = resolve_content_path(post.content_path)
+    try:
+        stat = path.stat()
+        body = path.read_text(encoding="utf-8")
+    except (FileNotFoundError, UnicodeDecodeError):
+        stat, body = None, ""
+    terms = document_terms(post.title, post.excerpt, body)
+    return IndexedDocument(
+        fingerprint=_fingerprint(post, stat),
+        terms=terms,
+        length=sum(terms.values()),
+    )
+
+
+def _stat_fingerprints(posts: list[models.Post]) -> dict[int, str]:
+    fingerprints = {}
+    for post in posts:
+        try:
+            stat = resolve_content_path(post.content_path).stat()
+        except FileNotFoundError:
+            stat = None
+        fingerprints[post.id] = _fingerprint(post, stat)
+    return fingerprints
+
+
+class SearchIndex:
+    def __init__(self, index_path: Path) -> None:
+        self.index_path = index_path
+        self.documents: dict[int, IndexedDocument] = {}
+        self.postings: dict[str, dict[int, int]] = {}
+        self.total_length = 0
+        self.ready = False
+        self.dirty = False
+        self.syncs = 0
+        # set when another process may have written posts this one never saw
+        self._sync_requested = asyncio.Event()
+
+    def request_sync(self) -> None:
+        self._sync_requested.set()
+
+    async def wait_for_sync_request(self, timeout: float) -> bool:
+        # True if a sync was requested before the timeout; either way the request is consumed
+        try:
+            await asyncio.wait_for(self._sync_requested.wait(), timeout=timeout)
+            requested = True
+        except asyncio.TimeoutError:
+            requested = False
+        self._sync_requested.clear()
+        return requested
+
+    def add(self, post_id: int, document: IndexedDocument) -> None:
+        self.remove(post_id)
+        self.documents[post_id] = document
+        self.total_length += document.length
+        for term, frequency in document.terms.items():
+            self.postings.setdefault(term, {})[post_id] = frequency
+        self.dirty = True
+
+    def remove(self, post_id: int) -> None:
+        document = self.documents.pop(post_id, None)
+        if document is None:
+            return
+        self.total_length -= document.length
+        for term in document.terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(post_id, None)
+            if not postings:
+                del self.postings[term]
+        self.dirty = True
+
+    def search(
+        self, query: str, offset: int = 0, limit: int = 20
+    ) -> tuple[int, list[tuple[int, float]]]:
+        terms = set(tokenize(query))
+        total_docs = len(self.documents)
+        if not terms or not total_docs:
+            return 0, []
+        average_length = self.total_length / total_docs or 1.0
+        scores: dict[int, float] = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            for post_id, frequency in postings.items():
+                length = self.documents[post_id].length
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                scores[post_id] = scores.get(post_id, 0.0) + idf * frequency * (
+                    BM25_K1 + 1
+                ) / (frequency + norm)
+        top = heapq.nlargest(
+            offset + limit, scores.items(), key=lambda item: (item[1], item[0])
+        )
+        return len(scores), top[offset:]
+
+    async def index_post(self, post: models.Post) -> None:
+        if not self.ready:
+            return
+        document = await asyncio.to_thread(_load_document, post)
+        self.add(post.id, document)
+
+    def remove_post(self, post_id: int) -> None:
+        if self.ready:
+            self.remove(post_id)
+
+    async def sync(self, session: AsyncSession) -> dict[str, int]:
+        # load the persisted index, then reindex only posts whose fingerprint changed
+        if not self.documents:
+            await asyncio.to_thread(self._load)
+        result = await session.execute(select(models.Post))
+        posts = list(result.scalars().all())
+        fingerprints = await asyncio.to_thread(_stat_fingerprints, posts)
+        stale = [
+            post
+            for post in posts
+            if (document := self.documents.get(post.id)) is None
+            or document.fingerprint != fingerprints[post.id]
+        ]
+        removed = set(self.documents) - {post.id for post in posts}
+        for post_id in removed:
+            self.remove(post_id)
+        for post in stale:
+            self.add(post.id, await asyncio.to_thread(_load_document, post))
+        self.ready = True
+        self.syncs += 1
+        await self.save()
+        return {
+            "documents": len(self.documents),
+            "reindexed": len(stale),
+            "removed": len(removed),
+        }
+
+    async def save(self) -> None:
+        if not self.dirty:
+            return
+        # cleared up front so changes made during the dump mark it dirty again
+        self.dirty = False
+        try:
+            # documents are immutable, so a shallow copy is a consistent snapshot
+            await asyncio.to_thread(self._dump, dict(self.documents))
+        except BaseException:
+            self.dirty = True
+            raise
+
+    def _dump(self, documents: dict[int, IndexedDocument]) -> None:
+        payload = {
+            "version": INDEX_FORMAT_VERSION,
+            "documents": {
+                str(post_id): [doc.fingerprint, doc.terms]
+                for post_id, doc in documents.items()
+            },
+        }
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # a unique temp file per dump: workers flushing at once must not share one
+        tmp = tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=self.index_path.parent,
+            prefix=f"{self.index_path.name}.",
+            suffix=".tmp",
+            delete=False,
+        )
+        try:
+            with tmp:
+                tmp.write(json.dumps(payload, ensure_ascii=False))
+            os.replace(tmp.name, self.index_path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+    def _load(self) -> None:
+        try:
+            payload = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return
+        if payload.get("version") != INDEX_FORMAT_VERSION:
+            return
+        for post_id, (fingerprint, terms) in payload["documents"].items():
+            self.add(
+                int(post_id),
+                IndexedDocument(
+                    fingerprint=fingerprint, terms=terms, length=sum(terms.values())
+                ),
+            )
+        self.dirty = False
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "documents": len(self.documents),
+            "terms": len(self.postings),
+            "dirty": self.dirty,
+            "syncs": self.syncs,
+        }
+
+
+search_index = SearchIndex(Path(settings.search_index_path))
+
+
+async def flush_periodically(interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await search_index.save()
+        except Exception:
+            # still dirty, so the next round retries
+            logger.exception("flushing the search index failed")
+
+
+async def sync_periodically(interval_seconds: float) -> None:
+    # picks up posts written by scripts and other workers; sync only reindexes
+    # posts whose fingerprint changed, so a quiet round is one SELECT plus stats
+    while True:
+        await search_index.wait_for_sync_request(interval_seconds)
+        try:
+            async with AsyncSessionFactory() as session:
+                await search_index.sync(session)
+        except Exception:
+            logger.exception("re-syncing the search index failed")
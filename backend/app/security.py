@@ -1,42 +1,245 @@
+import asyncio
+import base64
 import hashlib
+import hmac
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
 import jwt
 from fastapi import HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from .cache import TTLCache
 from .config import settings
+from .metrics import token_decode_duration
 
 ALGORITHM = "HS256"
 security_scheme = HTTPBearer(auto_error=False)
 
 
-def hash_password(password: str) -> str:
+# dedicated pool so KDF work never queues behind (or starves) default to_thread I/O
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="password-hash"
+)
+_hash_slots = asyncio.Semaphore(settings.password_hash_concurrency)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _legacy_sha256(password: str) -> str:
     salt = settings.secret_key
     return hashlib.sha256(f"{salt}{password}".encode("utf-8")).hexdigest()
 
 
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r * p,
+        dklen=32,
+    )
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def hash_password(password: str) -> str:
+    salt = os.urandom(16)
+    if settings.password_hash_scheme == "pbkdf2_sha256":
+        iterations = settings.pbkdf2_iterations
+        digest = _pbkdf2(password, salt, iterations)
+        return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+    n, r, p = settings.scrypt_n, settings.scrypt_r, settings.scrypt_p
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
 def verify_password(password: str, password_hash: str) -> bool:
-    return hash_password(password) == password_hash
+    scheme, _, params = password_hash.partition("$")
+    try:
+        if scheme == "scrypt":
+            n, r, p, salt, digest = params.split("$")
+            expected = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+        elif scheme == "pbkdf2_sha256":
+            iterations, salt, digest = params.split("$")
+            expected = _pbkdf2(password, _b64decode(salt), int(iterations))
+        elif not params:
+            return hmac.compare_digest(_legacy_sha256(password), password_hash)
+        else:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(expected, _b64decode(digest))
+
+
+def needs_rehash(password_hash: str) -> bool:
+    scheme, _, params = password_hash.partition("$")
+    if scheme != settings.password_hash_scheme:
+        return True
+    if scheme == "scrypt":
+        current = f"{settings.scrypt_n}${settings.scrypt_r}${settings.scrypt_p}"
+        return not params.startswith(f"{current}$")
+    if scheme == "pbkdf2_sha256":
+        return not params.startswith(f"{settings.pbkdf2_iterations}$")
+    return True
+
+
+async def _run_hashing(func, *args):
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await _run_hashing(verify_password, password, password_hash)
+
 
+token_cache: TTLCache[str, dict] = TTLCache(
+    max_entries=settings.auth_cache_max_entries,
+    ttl_seconds=settings.auth_cache_ttl_seconds,
+)
 
-def create_access_token(subject: str, expires_minutes: int) -> str:
+
+class RevocationList:
+    def __init__(self) -> None:
+        # jti -> token exp (unix seconds); a str key's hash is cached, so lookups allocate nothing
+        self._expires: dict[str, float] = {}
+        # highest revoked_tokens.id seen, for incremental refreshes
+        self.last_id = 0
+        self.rejected = 0
+        self.synced_at: float | None = None
+
+    def is_revoked(self, jti: str | None) -> bool:
+        return jti is not None and jti in self._expires
+
+    def add(self, jti: str, expires_at: float, row_id: int = 0) -> None:
+        self._expires[jti] = expires_at
+        if row_id > self.last_id:
+            self.last_id = row_id
+
+    def replace(self, entries: dict[str, float], last_id: int) -> None:
+        self._expires = entries
+        self.last_id = max(self.last_id, last_id)
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._expires),
+            "last_id": self.last_id,
+            "rejected": self.rejected,
+            "synced_at": self.synced_at,
+        }
+
+
+revoked_tokens = RevocationList()
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    id: int
+    role: str
+    membership_expires_at: datetime | None
+
+
+def create_access_token(
+    subject: str,
+    expires_minutes: int,
+    role: str | None = None,
+    membership_expires_at: datetime | None = None,
+    read_primary_until: int | None = None,
+) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
-    payload = {"sub": subject, "exp": expire}
+    # jti identifies the token for logout/revocation
+    payload = {"sub": subject, "exp": expire, "jti": secrets.token_hex(16)}
+    if read_primary_until is not None:
+        # read-your-writes: route this client's reads to the primary for a while
+        payload["rpw"] = read_primary_until
+    if role is not None:
+        # embedded so read-only access checks need no user query
+        payload["role"] = role
+        payload["mexp"] = (
+            int(membership_expires_at.timestamp()) if membership_expires_at else None
+        )
     return jwt.encode(payload, settings.secret_key, algorithm=ALGORITHM)
 
 
+def create_user_token(user, read_your_writes: bool = False) -> str:
+    membership_expires_at = user.membership_expires_at
+    if membership_expires_at is not None and membership_expires_at.tzinfo is None:
+        membership_expires_at = membership_expires_at.replace(tzinfo=timezone.utc)
+    return create_access_token(
+        subject=str(user.id),
+        expires_minutes=settings.access_token_expire_minutes,
+        role=user.role,
+        membership_expires_at=membership_expires_at,
+        read_primary_until=int(time.time()) + settings.read_your_writes_seconds
+        if read_your_writes
+        else None,
+    )
+
+
+def prefers_primary(payload: dict) -> bool:
+    return payload.get("rpw", 0) > time.time()
+
+
+def user_from_claims(payload: dict) -> TokenUser | None:
+    if "role" not in payload or not payload.get("sub"):
+        return None
+    mexp = payload.get("mexp")
+    return TokenUser(
+        id=int(payload["sub"]),
+        role=payload["role"],
+        membership_expires_at=(
+            datetime.fromtimestamp(mexp, tz=timezone.utc) if mexp is not None else None
+        ),
+    )
+
+
 def decode_token(token: str) -> dict:
-    try:
-        return jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="登录已过期，请重新登录"
-        )
-    except jwt.InvalidTokenError:
+    payload = token_cache.get(token)
+    if payload is not None and payload.get("exp", 0) <= time.time():
+        token_cache.pop(token)
+        payload = None
+    if payload is None:
+        try:
+            with token_decode_duration.time():
+                payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="登录已过期，请重新登录"
+            )
+        except jwt.InvalidTokenError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的访问凭证"
+            )
+        token_cache.set(token, payload)
+    # checked on cache hits too, so a logout does not wait for the token cache TTL
+    if revoked_tokens.is_revoked(payload.get("jti")):
+        revoked_tokens.rejected += 1
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的访问凭证"
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="登录已注销，请重新登录"
         )
+    return payload
 
 
 def get_token_from_credentials(
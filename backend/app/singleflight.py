@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight(Generic[K, T]):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[K, asyncio.Task] = {}
+        self.loads = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+        flights.append(self)
+
+    async def do(self, key: K, load: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = self._start(key, load)
+        else:
+            self.coalesced += 1
+        # shielded: a disconnecting caller must not cancel the load the others wait on
+        return await asyncio.shield(task)
+
+    def refresh(self, key: K, load: Callable[[], Awaitable[T]]) -> None:
+        # early refresh in the background; the caller keeps serving the cached value
+        if key in self._calls:
+            return
+        self.refreshes += 1
+        self._start(key, load)
+
+    def in_flight(self, key: K) -> bool:
+        return key in self._calls
+
+    def _start(self, key: K, load: Callable[[], Awaitable[T]]) -> asyncio.Task:
+        self.loads += 1
+        task = asyncio.ensure_future(load())
+        self._calls[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    def _finish(self, key: K, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # marks the exception as retrieved even if every waiter went away
+            self.errors += 1
+            logger.debug("single-flight %s load for %r failed: %r", self.name, key, error)
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "in_flight": len(self._calls),
+        }
+
+
+flights: list[SingleFlight] = []
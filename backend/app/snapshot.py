@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from . import crud, schemas
+from .config import settings
+from .content import available_encodings, compress
+from .database import AsyncSessionFactory
+from .http_cache import as_utc, make_etag
+from .search import search_index
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SnapshotPage:
+    body: bytes
+    encoded: dict[str, bytes]
+    etag: str
+    version: str
+
+
+def listing_version(latest: datetime | None, total: int) -> str:
+    # derived from the database, so every worker reports the same value for the same data
+    stamp = int(as_utc(latest).timestamp() * 1_000_000) if latest is not None else 0
+    return f"{total}-{stamp}"
+
+
+def read_signal(path: Path) -> int:
+    try:
+        return int(path.read_text(encoding="ascii").strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def notify_listing_changed(path: Path | None = None) -> int:
+    # for scripts running in another process: bump the counter the server polls
+    path = path or Path(settings.listing_snapshot_signal_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    value = read_signal(path) + 1
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(str(value), encoding="ascii")
+    os.replace(tmp, path)
+    return value
+
+
+class ListingSnapshot:
+    def __init__(
+        self, signal_path: Path, pages: int, page_size: int, max_age_seconds: float
+    ) -> None:
+        self.signal_path = signal_path
+        self.max_pages = pages
+        self.page_size = page_size
+        # backstop for edits no version check can see, e.g. a raw UPDATE of a title
+        self.max_age_seconds = max_age_seconds
+        # bumped on every post write; a snapshot is only served for the version it was built from
+        self.version = 0
+        self.built_version = -1
+        self.pages: dict[str, SnapshotPage] = {}
+        # (latest updated_at, row count) the pages were built from
+        self.built_state: tuple[datetime | None, int] | None = None
+        self.built_at: float | None = None
+        self.rebuilds = 0
+        self.hits = 0
+        self.misses = 0
+        self._signal = read_signal(signal_path)
+        self._dirty = asyncio.Event()
+
+    def mark_stale(self) -> None:
+        self.version += 1
+        self._dirty.set()
+
+    def get(self, cursor: str | None) -> SnapshotPage | None:
+        if self.built_version != self.version:
+            self.misses += 1
+            return None
+        page = self.pages.get(cursor or "")
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return page
+
+    async def rebuild(self) -> None:
+        version = self.version
+        raw_pages: list[tuple[str, bytes]] = []
+        async with AsyncSessionFactory() as session:
+            latest, total = await crud.posts_version(session, cached=False)
+            cursor: str | None = None
+            position = None
+            for _ in range(self.max_pages):
+                items, next_cursor = await crud.list_posts(
+                    session, limit=self.page_size, cursor=position, cached=False
+                )
+                page = schemas.PostPage.model_validate(
+                    {"items": items, "next_cursor": next_cursor}
+                )
+                raw_pages.append((cursor or "", page.model_dump_json().encode("utf-8")))
+                if next_cursor is None:
+                    break
+                cursor, position = next_cursor, crud.decode_cursor(next_cursor)
+        pages = await asyncio.to_thread(self._encode, raw_pages, latest, total)
+        if version != self.version:
+            # a write landed while building; the loop picks it up again
+            return
+        self.pages = pages
+        self.built_version = version
+        self.built_state = (latest, total)
+        self.built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def _encode(
+        self, raw_pages: list[tuple[str, bytes]], latest: datetime | None, total: int
+    ) -> dict[str, SnapshotPage]:
+        pages = {}
+        for cursor, body in raw_pages:
+            pages[cursor] = SnapshotPage(
+                body=body,
+                encoded={
+                    encoding: compress(body, encoding)
+                    for encoding in available_encodings()
+                },
+                # same validator the uncached path computes for this page
+                etag=make_etag(
+                    "posts", latest, total, self.page_size, cursor or None, None, None
+                ),
+                version=listing_version(latest, total),
+            )
+        return pages
+
+    async def _check_signal(self) -> None:
+        signal = await asyncio.to_thread(read_signal, self.signal_path)
+        if signal != self._signal:
+            self._signal = signal
+            # another process wrote posts: drop cached rows too, which marks us stale
+            crud.post_cache.clear()
+            search_index.request_sync()
+
+    async def _check_database(self) -> None:
+        if self.built_version != self.version:
+            # already due for a rebuild
+            return
+        # the primary, so a lagging replica cannot hide a write made by another worker
+        async with AsyncSessionFactory() as session:
+            state = await crud.posts_version(session, cached=False)
+        if state != self.built_state:
+            # written by another worker or host; their invalidations never reach us
+            crud.post_cache.clear()
+            search_index.request_sync()
+
+    def _expired(self) -> bool:
+        return (
+            self.built_at is not None
+            and time.monotonic() - self.built_at >= self.max_age_seconds
+        )
+
+    async def run(self, debounce_seconds: float, poll_seconds: float) -> None:
+        self.mark_stale()
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=poll_seconds)
+                # coalesce bursts of writes (bulk endpoints, the watcher) into one rebuild
+                await asyncio.sleep(debounce_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            try:
+                await self._check_signal()
+                await self._check_database()
+            except Exception:
+                logger.exception("checking the listing version failed")
+            # an expired snapshot keeps being served until its replacement is built
+            if self.built_version == self.version and not self._expired():
+                continue
+            try:
+                await self.rebuild()
+            except Exception:
+                # retried on the next poll; requests fall back to the database meanwhile
+                logger.exception("rebuilding the listing snapshot failed")
+                continue
+            if self.built_version != self.version:
+                self._dirty.set()
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "built_version": self.built_version,
+            "pages": len(self.pages),
+            "bytes": sum(len(page.body) for page in self.pages.values()),
+            "age_seconds": (
+                time.monotonic() - self.built_at if self.built_at is not None else None
+            ),
+            "rebuilds": self.rebuilds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+listing_snapshot = ListingSnapshot(
+    signal_path=Path(settings.listing_snapshot_signal_path),
+    pages=settings.listing_snapshot_pages,
+    page_size=settings.posts_page_size,
+    max_age_seconds=settings.listing_snapshot_max_age_seconds,
+)
+crud.post_cache.listeners.append(listing_snapshot.mark_stale)
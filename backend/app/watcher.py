@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from sqlalchemy import select, text
+
+from . import crud, models
+from .config import settings
+from .content import CONTENT_DIR, markdown_cache
+from .database import AsyncSessionFactory, engine
+from .importer import (
+    load_manifest,
+    prepare_file,
+    remove_derived,
+    save_manifest,
+    slugify,
+)
+from .migrations import named_lock
+from .search import search_index
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "mai_content_watcher"
+
+
+def _is_markdown(path: Path) -> bool:
+    return path.suffix == ".md" and path.parent == CONTENT_DIR
+
+
+def _snapshot(directory: Path) -> dict[Path, tuple[int, int]]:
+    snapshot = {}
+    for path in directory.glob("*.md"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+async def _unique_slug(session, path: Path, reserved: set[str]) -> str:
+    slug = slugify(path.stem)
+    taken = await session.scalar(
+        select(models.Post.id).where(models.Post.slug == slug)
+    )
+    if taken is not None or slug in reserved:
+        slug = f"{slug}-{hashlib.sha1(path.stem.encode('utf-8')).hexdigest()[:6]}"
+    reserved.add(slug)
+    return slug
+
+
+@asynccontextmanager
+async def _file_lock(path: Path) -> AsyncIterator[bool]:
+    # SQLite has no named locks; its workers share a host, so an flock will do
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        # closing the file releases the lock
+        yield True
+
+
+@asynccontextmanager
+async def _watcher_lock(conn, directory: Path) -> AsyncIterator[bool]:
+    async with named_lock(conn, LOCK_NAME, 0) as acquired:
+        if acquired is not None:
+            yield acquired
+            return
+    async with _file_lock(directory / ".watcher.lock") as acquired:
+        yield acquired
+
+
+async def apply_changes(changed: set[Path], removed: set[Path]) -> dict[str, int]:
+    names = [path.name for path in changed | removed]
+    manifest = await asyncio.to_thread(load_manifest)
+    created, updated, deleted = [], [], []
+
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(
+            select(models.Post).where(models.Post.content_path.in_(names))
+        )
+        by_path = {post.content_path: post for post in result.scalars().all()}
+        reserved: set[str] = set()
+
+        for path in sorted(changed):
+            post = by_path.get(path.name)
+            slug = post.slug if post and post.slug else await _unique_slug(
+                session, path, reserved
+            )
+            try:
+                prepared = await asyncio.to_thread(
+                    prepare_file, path, slug, CONTENT_DIR, manifest.get(slug)
+                )
+            except FileNotFoundError:
+                removed.add(path)
+                continue
+            manifest[slug] = prepared.digest
+            if post is None:
+                post = models.Post(
+                    title=prepared.parsed.title,
+                    excerpt=prepared.parsed.excerpt or None,
+                    content_path=prepared.content_path,
+                    tags="",
+                    slug=slug,
+                )
+                session.add(post)
+                created.append(post)
+            elif prepared.changed:
+                post.title = prepared.parsed.title
+                post.excerpt = prepared.parsed.excerpt or None
+                post.updated_at = models.utcnow()
+                updated.append(post)
+
+        for path in removed:
+            post = by_path.get(path.name)
+            if post is None or path.exists():
+                continue
+            await crud.set_post_tags(session, post, [])
+            await session.delete(post)
+            manifest.pop(post.slug, None)
+            deleted.append(post)
+
+        await session.commit()
+
+    for path in removed:
+        if not path.exists():
+            await asyncio.to_thread(remove_derived, path)
+
+    await asyncio.to_thread(save_manifest, manifest)
+    crud.post_cache.clear()
+    for path in changed | removed:
+        markdown_cache.invalidate(path.name)
+    for post in created + updated:
+        await search_index.index_post(post)
+    for post in deleted:
+        search_index.remove_post(post.id)
+    return {"created": len(created), "updated": len(updated), "deleted": len(deleted)}
+
+
+class ContentWatcher:
+    def __init__(
+        self,
+        directory: Path,
+        debounce_seconds: float,
+        poll_seconds: float,
+        force_polling: bool = False,
+        lock_seconds: float = 15.0,
+    ) -> None:
+        self.directory = directory
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.force_polling = force_polling
+        self.lock_seconds = lock_seconds
+
+    async def run(self) -> None:
+        # every worker runs this, but only the lock holder watches: parallel
+        # watchers would race on the same inserts. The others keep retrying so
+        # one takes over when the holder exits
+        while True:
+            try:
+                async with engine.connect() as conn, _watcher_lock(
+                    conn, self.directory
+                ) as acquired:
+                    if acquired:
+                        await self._lead(conn)
+            except Exception:
+                logger.exception("content watcher stopped, retrying")
+            await asyncio.sleep(self.lock_seconds)
+
+    async def _lead(self, conn) -> None:
+        logger.info("content watcher running in this worker")
+        watch = asyncio.create_task(self._watch())
+        try:
+            while True:
+                done, _ = await asyncio.wait({watch}, timeout=self.lock_seconds)
+                if done:
+                    watch.result()
+                    return
+                # the lock lives on this connection; if it dropped, so did the lock
+                await conn.execute(text("SELECT 1"))
+                await conn.commit()
+        finally:
+            watch.cancel()
+            await asyncio.gather(watch, return_exceptions=True)
+
+    async def _watch(self) -> None:
+        try:
+            import watchfiles
+        except ImportError:
+            watchfiles = None
+        if watchfiles is None or self.force_polling:
+            await self._poll()
+            return
+        async for events in watchfiles.awatch(
+            self.directory,
+            debounce=int(self.debounce_seconds * 1000),
+            watch_filter=lambda _, path: _is_markdown(Path(path)),
+            recursive=False,
+        ):
+            changed, removed = set(), set()
+            for change, raw_path in events:
+                path = Path(raw_path)
+                if change == watchfiles.Change.deleted:
+                    removed.add(path)
+                    changed.discard(path)
+                else:
+                    changed.add(path)
+                    removed.discard(path)
+            await self._apply(changed, removed)
+
+    async def _poll(self) -> None:
+        previous = await asyncio.to_thread(_snapshot, self.directory)
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            current = await asyncio.to_thread(_snapshot, self.directory)
+            if current == previous:
+                continue
+            # debounce: wait until the directory stops changing before applying
+            while True:
+                await asyncio.sleep(self.debounce_seconds)
+                settled = await asyncio.to_thread(_snapshot, self.directory)
+                if settled == current:
+                    break
+                current = settled
+            changed = {
+                path for path, stamp in current.items() if previous.get(path) != stamp
+            }
+            removed = set(previous) - set(current)
+            previous = current
+            await self._apply(changed, removed)
+
+    async def _apply(self, changed: set[Path], removed: set[Path]) -> None:
+        if not changed and not removed:
+            return
+        try:
+            summary = await apply_changes(changed, removed)
+            logger.info("content watcher applied %s", summary)
+        except Exception:
+            logger.exception("content watcher failed to apply changes")
+
+
+content_watcher = ContentWatcher(
+    CONTENT_DIR,
+    debounce_seconds=settings.content_watch_debounce_seconds,
+    poll_seconds=settings.content_watch_poll_seconds,
+    force_polling=settings.content_watch_force_polling,
+    lock_seconds=settings.content_watch_lock_seconds,
+)
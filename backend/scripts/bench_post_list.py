@@ -0,0 +1,169 @@
+"""Micro-benchmark for the post list serialization path.
+
+Usage:
+    python scripts/bench_post_list.py
+    python scripts/bench_post_list.py --posts 5000 --limit 100 --iterations 500
+
+Compares the previous ``/api/posts`` path (full ``models.Post`` hydration,
+per-item ``PostOut.model_validate``, then FastAPI's second validation and
+``jsonable_encoder`` pass) with the column-projected path used now (tuples
+from ``crud.list_posts`` validated once and dumped by pydantic-core). Both are
+measured end to end against a temporary SQLite database and on
+serialization alone, and the timings are printed as JSON.
+
+Requires ``aiosqlite`` (see ``requirements-bench.txt``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+TAGS = ["AI算法", "论文阅读", "软件开发", "工具", "部署"]
+
+
+def legacy_serialize(schemas, posts, next_cursor) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    page = schemas.PostPage(
+        items=[schemas.PostOut.model_validate(post) for post in posts],
+        next_cursor=next_cursor,
+    )
+    # what FastAPI does with response_model: dump, validate again, encode
+    validated = schemas.PostPage.model_validate(page.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_serialize(schemas, items, next_cursor) -> bytes:
+    page = schemas.PostPage.model_validate({"items": items, "next_cursor": next_cursor})
+    return page.model_dump_json().encode("utf-8")
+
+
+async def legacy_fetch(session, models, limit):
+    from sqlalchemy import select
+
+    result = await session.execute(
+        select(models.Post)
+        .order_by(models.Post.created_at.desc(), models.Post.id.desc())
+        .limit(limit + 1)
+    )
+    posts = list(result.scalars().all())
+    return posts[:limit], None
+
+
+def timed(iterations: int, func) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+async def atimed(iterations: int, func) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from app import crud, models, schemas
+    from app.database import AsyncSessionFactory, engine
+    from app.migrations import migrate
+
+    await migrate()
+    try:
+        async with AsyncSessionFactory() as session:
+            for index in range(args.posts):
+                session.add(
+                    models.Post(
+                        title=f"文章 {index} benchmark post",
+                        excerpt="用于基准测试的摘要 excerpt " * 4,
+                        content_path=f"post-{index}.md",
+                        tags=",".join(TAGS[: index % len(TAGS) + 1]),
+                        slug=f"post-{index}",
+                        visibility="member" if index % 3 == 0 else "registered",
+                    )
+                )
+            await session.commit()
+
+        async with AsyncSessionFactory() as session:
+            posts, _ = await legacy_fetch(session, models, args.limit)
+            items, next_cursor = await crud.list_posts(
+                session, limit=args.limit, cached=False
+            )
+            assert json.loads(legacy_serialize(schemas, posts, next_cursor)) == json.loads(
+                fast_serialize(schemas, items, next_cursor)
+            ), "fast path changed the response body"
+
+            async def legacy_end_to_end():
+                page, cursor = await legacy_fetch(session, models, args.limit)
+                legacy_serialize(schemas, page, cursor)
+                session.expunge_all()
+
+            async def fast_end_to_end():
+                page, cursor = await crud.list_posts(
+                    session, limit=args.limit, cached=False
+                )
+                fast_serialize(schemas, page, cursor)
+
+            results = {
+                "serialize_ms": {
+                    "legacy": timed(
+                        args.iterations,
+                        lambda: legacy_serialize(schemas, posts, next_cursor),
+                    ),
+                    "fast": timed(
+                        args.iterations,
+                        lambda: fast_serialize(schemas, items, next_cursor),
+                    ),
+                },
+                "end_to_end_ms": {
+                    "legacy": await atimed(args.iterations, legacy_end_to_end),
+                    "fast": await atimed(args.iterations, fast_end_to_end),
+                },
+            }
+    finally:
+        await engine.dispose()
+    for timings in results.values():
+        timings["speedup"] = timings["legacy"] / timings["fast"]
+        for key, value in timings.items():
+            timings[key] = round(value, 4)
+    return {
+        "posts": args.posts,
+        "limit": args.limit,
+        "iterations": args.iterations,
+        **results,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark post list serialization")
+    parser.add_argument("--posts", type=int, default=2000, help="合成文章数量")
+    parser.add_argument("--limit", type=int, default=100, help="每页条数")
+    parser.add_argument("--iterations", type=int, default=200, help="每种路径的重复次数")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="mai-bench-") as workdir:
+        # must be set before the app (and its settings) are imported
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(workdir) / 'bench.db'}"
+        os.environ["READ_DATABASE_URLS"] = ""
+        report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
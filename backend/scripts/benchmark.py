@@ -0,0 +1,315 @@
+"""Reproducible load benchmark for the MAI API.
+
+Usage:
+    python scripts/benchmark.py --posts 2000 --users 200 --concurrency 32
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --compare before.json --output after.json
+
+The benchmark generates a synthetic corpus (mixed CJK/Latin Markdown posts of
+varied sizes plus registered and member accounts) in a temporary directory,
+points the app at a fresh SQLite database there, and drives list, detail
+(anonymous, registered, member), login and register requests through an
+in-process ASGI client. Results (throughput and p50/p95/p99 latency per
+scenario) are printed as JSON so runs from different commits can be diffed.
+
+Requires ``httpx`` and ``aiosqlite`` in addition to ``requirements.txt``
+(see ``requirements-bench.txt``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+CJK_WORDS = [
+    "模型", "微调", "数据", "知识", "图谱", "检索", "增强", "向量", "嵌入", "部署",
+    "推理", "训练", "评估", "分类", "论文", "阅读", "工程", "配置", "流程", "排查",
+]
+LATIN_WORDS = [
+    "model", "fine", "tune", "dataset", "vector", "embedding", "retrieval",
+    "pipeline", "deploy", "docker", "wsl", "ssh", "python", "fastapi", "cuda",
+    "lora", "batch", "latency", "cache", "index",
+]
+TAGS = ["AI算法", "论文阅读", "软件开发", "工具", "部署", "大模型"]
+PASSWORD = "bench-password"
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = []
+    for _ in range(rng.randint(6, 18)):
+        if rng.random() < 0.6:
+            words.append(rng.choice(CJK_WORDS))
+        else:
+            words.append(f" {rng.choice(LATIN_WORDS)} ")
+    return "".join(words).strip() + "。"
+
+
+def make_markdown(rng: random.Random, title: str, target_bytes: int) -> str:
+    parts = [f"# {title}", ""]
+    size = 0
+    while size < target_bytes:
+        if rng.random() < 0.15:
+            block = "```python\n" + "\n".join(
+                f"{rng.choice(LATIN_WORDS)}_{i} = {rng.randint(0, 999)}"
+                for i in range(rng.randint(3, 12))
+            ) + "\n```"
+        elif rng.random() < 0.1:
+            block = f"## {make_sentence(rng)[:20]}"
+        else:
+            block = " ".join(make_sentence(rng) for _ in range(rng.randint(2, 6)))
+        parts.extend([block, ""])
+        size += len(block.encode("utf-8"))
+    return "\n".join(parts)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+async def generate_corpus(workdir: Path, posts: int, users: int, seed: int) -> dict:
+    from app import crud, models
+    from app.database import AsyncSessionFactory
+    from app.security import hash_password
+
+    rng = random.Random(seed)
+    content_dir = workdir / "content"
+    content_dir.mkdir()
+    slugs = {"registered": [], "member": []}
+    tagged = []
+    async with AsyncSessionFactory() as session:
+        for index in range(posts):
+            visibility = "member" if rng.random() < 0.3 else "registered"
+            title = f"{make_sentence(rng)[:24]} {index}"
+            # mostly small posts with a long tail of large ones
+            target = int(min(256 * 1024, rng.lognormvariate(9.0, 1.0)))
+            path = content_dir / f"post-{index}.md"
+            path.write_text(make_markdown(rng, title, target), encoding="utf-8")
+            slug = f"post-{index}"
+            post = models.Post(
+                title=title,
+                excerpt=make_sentence(rng)[:180],
+                content_path=str(path),
+                slug=slug,
+                visibility=visibility,
+            )
+            session.add(post)
+            tagged.append((post, rng.sample(TAGS, rng.randint(0, 2))))
+            slugs[visibility].append(slug)
+        # tag= list requests join post_tags, so the corpus needs the rows, not just
+        # the Post.tags string
+        await session.flush()
+        await crud.set_posts_tags(session, [(post, tags) for post, tags in tagged if tags])
+        # one hash for every account keeps corpus generation fast
+        password_hash = hash_password(PASSWORD)
+        expires = datetime.now(timezone.utc) + timedelta(days=30)
+        for index in range(users):
+            member = index % 2 == 1
+            session.add(
+                models.User(
+                    email=f"{'member' if member else 'user'}{index}@bench.local",
+                    password_hash=password_hash,
+                    role="member" if member else "user",
+                    membership_expires_at=expires if member else None,
+                )
+            )
+        await session.commit()
+    return slugs
+
+
+async def run_scenario(client, make_request, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for index in counter:
+            started = time.perf_counter()
+            response = await make_request(client, index)
+            latencies.append(time.perf_counter() - started)
+            key = str(response.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def login_token(client, email: str) -> str:
+    response = await client.post(
+        "/api/auth/login", json={"email": email, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    import httpx
+
+    from app import main
+    from app.database import engine
+    from app.migrations import migrate
+
+    await migrate()
+    try:
+        slugs = await generate_corpus(args.workdir, args.posts, args.users, args.seed)
+    except BaseException:
+        await engine.dispose()
+        raise
+    await main.on_startup()
+    rng = random.Random(args.seed + 1)
+    all_slugs = slugs["registered"] + slugs["member"]
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            user_headers = {
+                "Authorization": f"Bearer {await login_token(client, 'user0@bench.local')}"
+            }
+            member_headers = {
+                "Authorization": f"Bearer {await login_token(client, 'member1@bench.local')}"
+            }
+            run_id = int(time.time())
+            register_ids = itertools.count()
+            scenarios = {
+                "list": lambda c, i: c.get(
+                    "/api/posts", params={"limit": 20, **({"tag": TAGS[i % len(TAGS)]} if i % 4 == 0 else {})}
+                ),
+                "detail_anonymous": lambda c, i: c.get(
+                    f"/api/posts/slug/{rng.choice(all_slugs)}"
+                ),
+                "detail_registered": lambda c, i: c.get(
+                    f"/api/posts/slug/{rng.choice(slugs['registered'])}",
+                    headers=user_headers,
+                ),
+                "detail_member": lambda c, i: c.get(
+                    f"/api/posts/slug/{rng.choice(all_slugs)}", headers=member_headers
+                ),
+                "login": lambda c, i: c.post(
+                    "/api/auth/login",
+                    json={
+                        "email": f"user{2 * (i % max(1, args.users // 2))}@bench.local",
+                        "password": PASSWORD,
+                    },
+                ),
+                "register": lambda c, i: c.post(
+                    "/api/auth/register",
+                    json={
+                        "email": f"new{run_id}-{next(register_ids)}@bench.local",
+                        "password": PASSWORD,
+                    },
+                ),
+            }
+            for name, make_request in scenarios.items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                await run_scenario(client, make_request, args.warmup, args.concurrency)
+                results[name] = await run_scenario(
+                    client, make_request, args.requests, args.concurrency
+                )
+    finally:
+        await main.on_shutdown()
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "posts": args.posts,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(previous: dict, current: dict) -> dict:
+    deltas = {}
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        deltas[name] = {
+            key: round((result[key] - before[key]) / before[key] * 100, 2)
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+            if before.get(key)
+        }
+    return deltas
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the MAI API in-process")
+    parser.add_argument("--posts", type=int, default=1000, help="合成文章数量")
+    parser.add_argument("--users", type=int, default=100, help="合成用户数量（一半为会员）")
+    parser.add_argument("--requests", type=int, default=500, help="每个场景的请求数")
+    parser.add_argument("--warmup", type=int, default=20, help="每个场景的预热请求数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发请求数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子，保证语料可复现")
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        help="只运行指定场景: list detail_anonymous detail_registered detail_member login register",
+    )
+    parser.add_argument("--output", type=Path, help="将 JSON 结果写入文件")
+    parser.add_argument("--compare", type=Path, help="与之前的 JSON 结果对比（百分比变化）")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="mai-bench-") as workdir:
+        args.workdir = Path(workdir)
+        # must be set before the app (and its settings) are imported
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{args.workdir / 'bench.db'}"
+        os.environ["READ_DATABASE_URLS"] = ""
+        os.environ["SEARCH_INDEX_PATH"] = str(args.workdir / "search" / "index.json")
+        os.environ["CONTENT_WATCH"] = "false"
+        report = asyncio.run(benchmark(args))
+    if args.compare:
+        report["delta_percent"] = compare(
+            json.loads(args.compare.read_text(encoding="utf-8")), report
+        )
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,11 @@ Examples:
 
     # Delete specific posts by slug
     python scripts/clear_posts.py --slug calm-productivity-stack micro-interactions
+
+The running server keeps its own caches, which this process cannot reach. When
+done, the script bumps the listing-version signal file
+(``LISTING_SNAPSHOT_SIGNAL_PATH``); every server worker notices on its next
+poll and drops its post caches and listing snapshot.
 """
 
 from __future__ import annotations
@@ -13,7 +18,7 @@ from __future__ import annotations
 import argparse
 import asyncio
 
-from sqlalchemy import delete
+from sqlalchemy import delete, update
 
 import sys
 from pathlib import Path
@@ -24,10 +29,13 @@ if str(ROOT_DIR) not in sys.path:
 
 from app import crud, models
 from app.database import AsyncSessionFactory, engine
+from app.snapshot import notify_listing_changed
 
 
 async def delete_all() -> int:
     async with AsyncSessionFactory() as session:
+        await session.execute(delete(models.PostTag))
+        await session.execute(update(models.Tag).values(post_count=0))
         result = await session.execute(delete(models.Post))
         await session.commit()
         return result.rowcount or 0
@@ -35,13 +43,12 @@ async def delete_all() -> int:
 
 async def delete_by_slugs(slugs: list[str]) -> None:
     async with AsyncSessionFactory() as session:
-        for slug in slugs:
-            post = await crud.get_post_by_slug(session, slug)
-            if not post:
-                print(f"[skip] 未找到 slug = {slug}")
-                continue
-            await crud.delete_post(session, post)
-            print(f"[delete] 已移除 slug = {slug}")
+        results = await crud.bulk_delete_posts(session, slugs)
+    for result in results:
+        if result.status == "deleted":
+            print(f"[delete] 已移除 slug = {result.slug}")
+        else:
+            print(f"[skip] 未找到 slug = {result.slug}")
 
 
 def parse_args() -> argparse.Namespace:
@@ -79,6 +86,7 @@ async def main() -> None:
     else:
         await delete_by_slugs(args.slug)
         print("指定的文章处理完成。")
+    notify_listing_changed()
     await engine.dispose()
 
 
@@ -0,0 +1,55 @@
+"""Rebuild precompressed variants of the Markdown files in the content directory.
+
+Usage:
+    python scripts/compress_content.py
+    python scripts/compress_content.py --dir ./content
+
+For every ``.md`` file a gzip (and, when the ``brotli`` package is installed,
+a brotli) variant named ``<file>.<content-hash>.<gz|br>`` is written next to
+it. Variants left over from previous versions of the file are removed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.content import CONTENT_DIR, write_variants
+
+
+def compress_directory(directory: Path) -> int:
+    count = 0
+    for md_file in sorted(directory.glob("*.md")):
+        variants = write_variants(md_file)
+        count += 1
+        print(f"[compress] {md_file.name} -> {', '.join(v.name for v in variants)}")
+    return count
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Precompress markdown content")
+    parser.add_argument(
+        "--dir",
+        dest="directory",
+        type=lambda value: Path(value).expanduser().resolve(),
+        default=CONTENT_DIR,
+        help=f"Markdown 文件所在目录 (默认: {CONTENT_DIR})",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.directory.is_dir():
+        raise SystemExit(f"目录 {args.directory} 不存在或不是文件夹")
+    count = compress_directory(args.directory)
+    print(f"完成：处理 {count} 个 Markdown 文件。")
+
+
+if __name__ == "__main__":
+    main()
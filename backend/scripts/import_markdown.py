@@ -2,123 +2,140 @@
 
 Usage:
     python scripts/import_markdown.py --dir ./content
-
-The script will scan all ``.md`` files inside the target directory, derive a
-slug from each filename, and create a new post if the slug does not already
-exist in the database. Existing posts (matched by slug) will be skipped.
+    python scripts/import_markdown.py --dir ./content --workers 8 --batch-size 500
+
+The script scans all ``.md`` files inside the target directory, derives a slug
+from each filename (non-ASCII names such as ``知识图谱.md`` keep their
+characters; clashing names get a short hash suffix) and parses the files in a
+process pool. Existing slugs are prefetched in a single query. New posts are
+inserted and changed posts updated in place, in batched transactions. Files
+whose content hash matches the last import are skipped. Gzip/brotli variants
+and the rendered HTML of every changed file are written next to it.
+
+If any post was added or updated, the script bumps the listing-version signal
+file (``LISTING_SNAPSHOT_SIGNAL_PATH``) at the end. The running server workers
+see it on their next poll and drop their post caches and listing snapshot;
+nothing this process caches itself reaches them.
 """
 
 from __future__ import annotations
 
 import argparse
 import asyncio
-import re
-import shutil
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 
+from sqlalchemy import select, update
+
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from app import crud, schemas
+from app import models
 from app.database import AsyncSessionFactory, engine
+from app.importer import (
+    PreparedPost,
+    assign_slugs,
+    load_manifest,
+    prepare_file,
+    save_manifest,
+)
+from app.snapshot import notify_listing_changed
 
 DEFAULT_CONTENT_DIR = Path(__file__).resolve().parent.parent / "content"
 
 
-@dataclass
-class ParsedPost:
-    slug: str
-    title: str
-    excerpt: str
-    source_path: Path
-
-
-def slugify(name: str) -> str:
-    slug = re.sub(r"[^a-zA-Z0-9]+", "-", name).strip("-")
-    return slug.lower() or "post"
-
-
-def extract_excerpt(markdown_body: str) -> str:
-    # Pick the first non-empty paragraph as excerpt, strip simple markdown syntax
-    paragraphs = [paragraph.strip() for paragraph in markdown_body.split("\n\n")]
-    for paragraph in paragraphs:
-        if not paragraph:
-            continue
-        # strip link syntax [text](url) -> text
-        paragraph = re.sub(r"\[(?P<text>[^\]]+)\]\([^\)]+\)", r"\g<text>", paragraph)
-        # remove residual markdown symbols such as #, *, `, >, _
-        paragraph = re.sub(r"[#>*`_]", "", paragraph)
-        return paragraph[:180] + ("..." if len(paragraph) > 180 else "")
-    return ""
-
-
-def parse_markdown_file(path: Path) -> ParsedPost:
-    raw_text = path.read_text(encoding="utf-8")
-    lines = raw_text.splitlines()
-
-    title = path.stem.replace("_", " ").strip()
-    body_start = 0
+async def prepare_files(
+    files: list[Path], target_dir: Path, manifest: dict[str, str], workers: int | None
+) -> list[PreparedPost]:
+    slugs = assign_slugs(files)
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool,
+                    prepare_file,
+                    path,
+                    slugs[path],
+                    target_dir,
+                    manifest.get(slugs[path]),
+                )
+                for path in sorted(files)
+            )
+        )
 
-    for idx, line in enumerate(lines):
-        if line.startswith("# "):
-            title = line.lstrip("# ").strip()
-            body_start = idx + 1
-            break
 
-    markdown_body = "\n".join(lines[body_start:]).strip()
-    if not markdown_body:
-        markdown_body = raw_text.strip()
+async def apply_prepared(
+    prepared: list[PreparedPost], existing: dict[str, int], batch_size: int
+) -> tuple[int, int, int]:
+    inserts = [item for item in prepared if item.parsed.slug not in existing]
+    updates = [
+        item for item in prepared if item.parsed.slug in existing and item.changed
+    ]
+    skipped = len(prepared) - len(inserts) - len(updates)
 
-    excerpt = extract_excerpt(markdown_body)
+    async with AsyncSessionFactory() as session:
+        for start in range(0, len(inserts), batch_size):
+            batch = inserts[start : start + batch_size]
+            session.add_all(
+                models.Post(
+                    title=item.parsed.title,
+                    excerpt=item.parsed.excerpt or None,
+                    content_path=item.content_path,
+                    tags="",
+                    slug=item.parsed.slug,
+                )
+                for item in batch
+            )
+            await session.commit()
+            for item in batch:
+                print(f"[add]  {item.parsed.source_path.name} -> '{item.parsed.slug}'")
+        for start in range(0, len(updates), batch_size):
+            batch = updates[start : start + batch_size]
+            now = models.utcnow()
+            await session.execute(
+                update(models.Post),
+                [
+                    {
+                        "id": existing[item.parsed.slug],
+                        "title": item.parsed.title,
+                        "excerpt": item.parsed.excerpt or None,
+                        "content_path": item.content_path,
+                        "updated_at": now,
+                    }
+                    for item in batch
+                ],
+            )
+            await session.commit()
+            for item in batch:
+                print(f"[update] {item.parsed.source_path.name} -> '{item.parsed.slug}'")
+    return len(inserts), len(updates), skipped
 
-    return ParsedPost(
-        slug=slugify(path.stem),
-        title=title or path.stem,
-        excerpt=excerpt,
-        source_path=path,
-    )
 
+async def fetch_existing_slugs() -> dict[str, int]:
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(select(models.Post.slug, models.Post.id))
+        return {slug: post_id for slug, post_id in result.all() if slug}
 
-async def import_markdown(directory: Path) -> tuple[int, int]:
-    created = 0
-    skipped = 0
 
+async def import_markdown(
+    directory: Path, workers: int | None = None, batch_size: int = 200
+) -> tuple[int, int, int]:
     target_dir = DEFAULT_CONTENT_DIR
     target_dir.mkdir(parents=True, exist_ok=True)
 
-    async with AsyncSessionFactory() as session:
-        for md_file in sorted(directory.glob("*.md")):
-            parsed = parse_markdown_file(md_file)
-            existing = await crud.get_post_by_slug(session, parsed.slug)
-            if existing:
-                skipped += 1
-                print(f"[skip] {md_file.name} -> slug '{parsed.slug}' already exists")
-                continue
-
-            destination = target_dir / f"{parsed.slug}{md_file.suffix}"
-            try:
-                if md_file.resolve() != destination.resolve():
-                    shutil.copy2(parsed.source_path, destination)
-            except FileNotFoundError:
-                shutil.copy2(parsed.source_path, destination)
-
-            # store relative path (no leading slash) so backend can resolve against content dir
-            relative_path = destination.relative_to(target_dir).as_posix()
-            payload = schemas.PostCreate(
-                title=parsed.title,
-                excerpt=parsed.excerpt or None,
-                content_path=relative_path,
-                tags=[],
-                slug=parsed.slug,
-            )
-            await crud.create_post(session, payload)
-            created += 1
-            print(f"[add]  {md_file.name} -> created post '{parsed.title}'")
-
-    return created, skipped
+    existing = await fetch_existing_slugs()
+    manifest = load_manifest()
+    prepared = await prepare_files(
+        list(directory.glob("*.md")), target_dir, manifest, workers
+    )
+    # a post missing from the database is always inserted, even if its hash is known
+    created, updated, skipped = await apply_prepared(prepared, existing, batch_size)
+    manifest.update({item.parsed.slug: item.digest for item in prepared})
+    save_manifest(manifest)
+    return created, updated, skipped
 
 
 def validate_directory(path: Path) -> Path:
@@ -136,13 +153,29 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_CONTENT_DIR,
         help=f"Markdown 文件所在目录 (默认: {DEFAULT_CONTENT_DIR})",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="解析 Markdown 的进程数 (默认: CPU 核数)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=200,
+        help="每个数据库事务写入的文章数 (默认: 200)",
+    )
     return parser.parse_args()
 
 
 async def main() -> None:
     args = parse_args()
-    created, skipped = await import_markdown(args.directory)
-    print(f"完成：新增 {created} 篇，跳过 {skipped} 篇。")
+    created, updated, skipped = await import_markdown(
+        args.directory, workers=args.workers, batch_size=args.batch_size
+    )
+    print(f"完成：新增 {created} 篇，更新 {updated} 篇，跳过 {skipped} 篇。")
+    if created or updated:
+        notify_listing_changed()
     await engine.dispose()
 
 
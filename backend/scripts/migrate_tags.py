@@ -0,0 +1,44 @@
+"""Migrate comma-joined ``posts.tags`` strings into the ``tags``/``post_tags`` tables.
+
+Usage:
+    python scripts/migrate_tags.py
+
+The same backfill runs once as schema migration 4 on startup. The script
+applies any pending migrations, then re-links every post to the tags listed
+in its ``tags`` column (dropping links no longer listed) and recomputes
+``tags.post_count`` from ``post_tags``. It is idempotent and can be re-run
+after manual edits. Afterwards it bumps the listing-version signal file
+(``LISTING_SNAPSHOT_SIGNAL_PATH``) so running server workers drop their
+cached posts and tags on their next poll.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.database import engine
+from app.migrations import backfill_post_tags, migrate
+from app.snapshot import notify_listing_changed
+
+
+async def migrate_tags() -> tuple[int, int]:
+    await migrate()
+    async with engine.begin() as conn:
+        return await backfill_post_tags(conn)
+
+
+async def main() -> None:
+    posts, tags = await migrate_tags()
+    print(f"完成：处理 {posts} 篇文章，共 {tags} 个标签。")
+    notify_listing_changed()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
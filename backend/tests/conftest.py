@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+# settings are read when app.config is first imported, so the two SQLite files
+# standing in for primary and replica must be configured before any app import
+_workdir = Path(tempfile.mkdtemp(prefix="mai-tests-"))
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_workdir / 'primary.db'}",
+    READ_DATABASE_URLS=f"sqlite+aiosqlite:///{_workdir / 'replica.db'}",
+    READ_REPLICA_STRATEGY="round_robin",
+    SEARCH_INDEX_PATH=str(_workdir / "search.json"),
+    LISTING_SNAPSHOT_SIGNAL_PATH=str(_workdir / ".listing-version"),
+    PROFILE_DIR=str(_workdir / "profiles"),
+    SCRYPT_N="1024",
+)
+
+
+@pytest.fixture
+def workdir() -> Path:
+    return _workdir
+
+
+@pytest.fixture
+def run():
+    from app.database import engine, replica_router
+
+    def run_in_loop(coroutine):
+        async def wrapper():
+            try:
+                return await coroutine
+            finally:
+                # pooled aiosqlite connections belong to this event loop
+                await engine.dispose()
+                await replica_router.dispose()
+
+        return asyncio.run(wrapper())
+
+    return run_in_loop
+
+
+@pytest.fixture
+def client():
+    import httpx
+
+    from app import main
+
+    def make():
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://testserver"
+        )
+
+    return make
+
+
+@pytest.fixture
+def db(run, monkeypatch):
+    # an empty, migrated primary with cold caches; reads go to the primary too,
+    # so tests outside test_read_replicas see their own writes
+    from app import crud, database
+    from app.database import Base, ReplicaRouter, engine
+    from app.migrations import migrate
+    from app.security import revoked_tokens, token_cache
+
+    async def reset():
+        await migrate(engine)
+        async with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                await conn.execute(table.delete())
+
+    run(reset())
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter([]))
+    crud.post_cache.clear()
+    crud.user_cache.clear()
+    token_cache.clear()
+    revoked_tokens.replace({}, 0)
+    revoked_tokens.last_id = 0
+    yield
+    crud.post_cache.clear()
+    crud.user_cache.clear()
+    token_cache.clear()
+    revoked_tokens.replace({}, 0)
+    revoked_tokens.last_id = 0
+
+
+@pytest.fixture
+def auth_headers(db):
+    # a user of the given role, returned as a bearer header for the API client
+    from app import crud
+    from app.database import AsyncSessionFactory
+    from app.security import create_user_token
+
+    async def make(role: str = "user", email: str | None = None) -> dict:
+        async with AsyncSessionFactory() as session:
+            user = await crud.create_user(
+                session, email=email or f"{role}@example.com", password_hash="-", role=role
+            )
+        return {"Authorization": f"Bearer {create_user_token(user)}"}
+
+    return make
@@ -0,0 +1,90 @@
+from sqlalchemy import update
+
+from app import crud, models, schemas
+from app.config import settings
+from app.database import AsyncSessionFactory
+from app.security import create_access_token, decode_token
+
+
+async def add_member_post(tmp_path) -> None:
+    path = tmp_path / "vip.md"
+    path.write_text("会员正文", encoding="utf-8")
+    async with AsyncSessionFactory() as session:
+        await crud.create_post(
+            session,
+            schemas.PostCreate(
+                title="vip", content_path=str(path), slug="vip", visibility="member"
+            ),
+        )
+
+
+def no_user_lookup(*args, **kwargs):
+    raise AssertionError("the token claims should have been enough")
+
+
+def test_detail_access_is_decided_from_token_claims(
+    run, client, auth_headers, tmp_path, monkeypatch
+):
+    async def scenario():
+        await add_member_post(tmp_path)
+        user = await auth_headers()
+        async with client() as http:
+            upgraded = (await http.post("/api/auth/upgrade", headers=user)).json()
+            member = {"Authorization": f"Bearer {upgraded['access_token']}"}
+            monkeypatch.setattr(crud, "get_user", no_user_lookup)
+            refused = await http.get("/api/posts/slug/vip", headers=user)
+            allowed = await http.get("/api/posts/slug/vip", headers=member)
+        assert refused.status_code == 403
+        assert allowed.status_code == 200
+        assert allowed.json()["content"] == "会员正文"
+        claims = decode_token(upgraded["access_token"])
+        assert claims["role"] == "member"
+        assert claims["mexp"] > 0
+
+    run(scenario())
+
+
+def test_tokens_without_claims_fall_back_to_a_lookup(db, run, client, tmp_path):
+    async def scenario():
+        await add_member_post(tmp_path)
+        async with AsyncSessionFactory() as session:
+            user = await crud.create_user(session, "old@example.com", "-", role="member")
+        # issued before role claims existed
+        token = create_access_token(str(user.id), settings.access_token_expire_minutes)
+        async with client() as http:
+            response = await http.get(
+                "/api/posts/slug/vip", headers={"Authorization": f"Bearer {token}"}
+            )
+        assert response.status_code == 200
+
+    run(scenario())
+
+
+def test_cached_user_is_dropped_on_upgrade(run, client, auth_headers):
+    async def scenario():
+        headers = await auth_headers()
+        async with client() as http:
+            assert (await http.get("/api/auth/me", headers=headers)).json()["role"] == "user"
+            await http.post("/api/auth/upgrade", headers=headers)
+            me = await http.get("/api/auth/me", headers=headers)
+        assert me.json()["role"] == "member"
+
+    run(scenario())
+
+
+def test_admin_rights_are_rechecked_against_the_database(run, client, auth_headers):
+    async def scenario():
+        headers = await auth_headers("admin")
+        async with client() as http:
+            assert (await http.get("/api/admin/cache", headers=headers)).status_code == 200
+            async with AsyncSessionFactory() as session:
+                await session.execute(update(models.User).values(role="user"))
+                await session.commit()
+            # the user cache and the token still say admin
+            token = headers["Authorization"].removeprefix("Bearer ")
+            user_id = int(decode_token(token)["sub"])
+            assert crud.user_cache.get(user_id).role == "admin"
+            response = await http.get("/api/admin/cache", headers=headers)
+        assert response.status_code == 403
+
+    run(scenario())
@@ -0,0 +1,67 @@
+import asyncio
+import random
+
+from sqlalchemy import func, select
+
+from app import models
+from app.database import AsyncSessionFactory
+from scripts import benchmark
+
+
+def test_corpus_text_is_reproducible_from_the_seed():
+    first = benchmark.make_markdown(random.Random(7), "标题", 2048)
+    second = benchmark.make_markdown(random.Random(7), "标题", 2048)
+    assert first == second
+    assert first.startswith("# 标题\n")
+    assert len(first.encode("utf-8")) >= 2048
+    assert first != benchmark.make_markdown(random.Random(8), "标题", 2048)
+
+
+def test_generated_corpus_is_loaded_with_tags_and_accounts(db, run, tmp_path):
+    async def scenario():
+        slugs = await benchmark.generate_corpus(tmp_path, posts=12, users=4, seed=3)
+        async with AsyncSessionFactory() as session:
+            posts = await session.scalar(select(func.count(models.Post.id)))
+            links = await session.scalar(select(func.count()).select_from(models.PostTag))
+            result = await session.execute(
+                select(models.User.role, func.count(models.User.id)).group_by(
+                    models.User.role
+                )
+            )
+            roles = dict(result.all())
+        return slugs, posts, links, roles
+
+    slugs, posts, links, roles = run(scenario())
+    assert posts == 12
+    assert roles == {"user": 2, "member": 2}
+    assert sorted(slugs["registered"] + slugs["member"]) == sorted(
+        f"post-{index}" for index in range(12)
+    )
+    assert links > 0
+    assert len(list((tmp_path / "content").glob("*.md"))) == 12
+
+
+def test_scenario_summary_and_comparison():
+    class Response:
+        status_code = 200
+
+    async def request(client, index):
+        await asyncio.sleep(0)
+        return Response()
+
+    result = asyncio.run(benchmark.run_scenario(None, request, total=10, concurrency=3))
+    assert result["requests"] == 10
+    assert result["statuses"] == {"200": 10}
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+    assert benchmark.percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.0
+    assert benchmark.percentile([], 0.99) == 0.0
+    before = {"throughput_rps": 100, "p50_ms": 10, "p95_ms": 20, "p99_ms": 40}
+    after = {"throughput_rps": 150, "p50_ms": 5, "p95_ms": 20, "p99_ms": 30}
+    deltas = benchmark.compare(
+        {"scenarios": {"list": before}}, {"scenarios": {"list": after, "login": after}}
+    )
+    # scenarios missing from the earlier run are not compared
+    assert deltas == {
+        "list": {"throughput_rps": 50.0, "p50_ms": -50.0, "p95_ms": 0.0, "p99_ms": -25.0}
+    }
@@ -0,0 +1,118 @@
+from sqlalchemy import select
+
+from app import crud, models, schemas
+from app.database import AsyncSessionFactory
+
+
+def new_post(slug: str, **fields) -> dict:
+    return {"title": slug, "content_path": f"{slug}.md", "slug": slug, **fields}
+
+
+async def stored_posts() -> dict[str, models.Post]:
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(select(models.Post))
+        return {post.slug: post for post in result.scalars().all()}
+
+
+def test_bulk_create_reports_each_item(run, client, auth_headers):
+    async def scenario():
+        admin = await auth_headers("admin")
+        async with AsyncSessionFactory() as session:
+            await crud.create_post(session, schemas.PostCreate(**new_post("taken")))
+        items = [
+            new_post("a", tags=["python"]),
+            new_post("taken"),
+            new_post("b", tags="python, go"),
+            new_post("a"),
+        ]
+        async with client() as http:
+            response = await http.post(
+                "/api/admin/posts/bulk-create", json={"items": items}, headers=admin
+            )
+            tags = (await http.get("/api/tags")).json()
+        assert [(item["slug"], item["status"]) for item in response.json()] == [
+            ("a", "created"),
+            ("taken", "conflict"),
+            ("b", "created"),
+            ("a", "conflict"),
+        ]
+        posts = await stored_posts()
+        assert response.json()[0]["id"] == posts["a"].id
+        assert posts["b"].tags == "python,go"
+        assert {tag["name"]: tag["post_count"] for tag in tags} == {"python": 2, "go": 1}
+
+    run(scenario())
+
+
+def test_failed_bulk_update_rolls_back_every_item(run, client, auth_headers):
+    async def scenario():
+        admin = await auth_headers("admin")
+        async with AsyncSessionFactory() as session:
+            for slug in ("a", "b"):
+                await crud.create_post(session, schemas.PostCreate(**new_post(slug)))
+        items = [
+            {"slug": "a", "changes": {"title": "renamed", "tags": ["x"]}},
+            # clashes with a's unique slug: the whole batch must fail
+            {"slug": "b", "changes": {"slug": "a"}},
+        ]
+        async with client() as http:
+            response = await http.post(
+                "/api/admin/posts/bulk-update", json={"items": items}, headers=admin
+            )
+            tags = (await http.get("/api/tags")).json()
+        assert response.status_code == 409
+        assert response.json()["detail"] == "批量操作与现有数据冲突，已全部回滚"
+        posts = await stored_posts()
+        assert posts["a"].title == "a"
+        assert posts["a"].tags == ""
+        assert set(posts) == {"a", "b"}
+        assert tags == []
+
+    run(scenario())
+
+
+def test_bulk_delete_and_visibility(run, client, auth_headers):
+    async def scenario():
+        admin = await auth_headers("admin")
+        async with AsyncSessionFactory() as session:
+            for slug in ("a", "b", "c"):
+                await crud.create_post(
+                    session, schemas.PostCreate(**new_post(slug, tags=["t"]))
+                )
+        async with client() as http:
+            hidden = await http.post(
+                "/api/admin/posts/visibility",
+                json={"slugs": ["a", "missing"], "visibility": "member"},
+                headers=admin,
+            )
+            invalid = await http.post(
+                "/api/admin/posts/visibility",
+                json={"slugs": ["a"], "visibility": "public-ish"},
+                headers=admin,
+            )
+            deleted = await http.post(
+                "/api/admin/posts/bulk-delete", json={"slugs": ["b", "c"]}, headers=admin
+            )
+            listed = (await http.get("/api/posts", params={"limit": 10})).json()
+            tags = (await http.get("/api/tags")).json()
+        assert [item["status"] for item in hidden.json()] == ["updated", "not_found"]
+        assert invalid.status_code == 422
+        assert [item["status"] for item in deleted.json()] == ["deleted", "deleted"]
+        assert [(item["slug"], item["visibility"]) for item in listed["items"]] == [
+            ("a", "member")
+        ]
+        assert tags == [{"name": "t", "post_count": 1}]
+
+    run(scenario())
+
+
+def test_bulk_endpoints_require_an_admin(run, client, auth_headers):
+    async def scenario():
+        user = await auth_headers()
+        async with client() as http:
+            response = await http.post(
+                "/api/admin/posts/bulk-delete", json={"slugs": ["a"]}, headers=user
+            )
+        assert response.status_code == 403
+
+    run(scenario())
@@ -0,0 +1,99 @@
+from app import crud, schemas
+from app.content import markdown_cache
+from app.database import AsyncSessionFactory
+
+
+async def add_post(slug: str, content_path: str, **fields) -> None:
+    async with AsyncSessionFactory() as session:
+        await crud.create_post(
+            session,
+            schemas.PostCreate(title=slug, content_path=content_path, slug=slug, **fields),
+        )
+
+
+def test_list_etag_revalidates_and_changes_on_delete(db, run, client):
+    async def scenario():
+        await add_post("a", "a.md")
+        await add_post("b", "b.md")
+        # a non-default limit skips the snapshot and exercises the database path
+        params = {"limit": 5}
+        async with client() as http:
+            first = await http.get("/api/posts", params=params)
+            etag = first.headers["ETag"]
+            assert "Last-Modified" not in first.headers
+            again = await http.get(
+                "/api/posts", params=params, headers={"If-None-Match": f'W/{etag}'}
+            )
+            assert again.status_code == 304
+            assert again.content == b""
+            assert again.headers["ETag"] == etag
+
+            async with AsyncSessionFactory() as session:
+                await crud.delete_post(session, await crud.get_post_by_slug(session, "a"))
+            after = await http.get(
+                "/api/posts", params=params, headers={"If-None-Match": etag}
+            )
+        assert after.status_code == 200
+        assert after.headers["ETag"] != etag
+        assert [item["slug"] for item in after.json()["items"]] == ["b"]
+
+    run(scenario())
+
+
+def test_detail_supports_etag_and_if_modified_since(db, run, client, auth_headers, tmp_path):
+    path = tmp_path / "detail.md"
+    path.write_text("# first", encoding="utf-8")
+
+    async def scenario():
+        await add_post("detail", str(path))
+        headers = await auth_headers()
+        async with client() as http:
+            first = await http.get("/api/posts/slug/detail", headers=headers)
+            assert first.status_code == 200
+            assert first.json()["content"] == "# first"
+            etag = first.headers["ETag"]
+            last_modified = first.headers["Last-Modified"]
+            assert first.headers["Cache-Control"] == "private, no-cache"
+
+            cached = await http.get(
+                "/api/posts/slug/detail", headers={**headers, "If-None-Match": etag}
+            )
+            assert cached.status_code == 304
+            since = await http.get(
+                "/api/posts/slug/detail",
+                headers={**headers, "If-Modified-Since": last_modified},
+            )
+            assert since.status_code == 304
+            # each body format is its own representation
+            html = await http.get(
+                "/api/posts/slug/detail",
+                params={"format": "html"},
+                headers={**headers, "If-None-Match": etag},
+            )
+            assert html.status_code == 200
+
+            path.write_text("# second, longer", encoding="utf-8")
+            markdown_cache.invalidate(str(path))
+            changed = await http.get(
+                "/api/posts/slug/detail", headers={**headers, "If-None-Match": etag}
+            )
+        assert changed.status_code == 200
+        assert changed.json()["content"] == "# second, longer"
+        assert changed.headers["ETag"] != etag
+
+    run(scenario())
+
+
+def test_validators_are_not_checked_before_access(db, run, client, tmp_path):
+    path = tmp_path / "locked.md"
+    path.write_text("secret", encoding="utf-8")
+
+    async def scenario():
+        await add_post("locked", str(path))
+        async with client() as http:
+            response = await http.get(
+                "/api/posts/slug/locked", headers={"If-None-Match": "*"}
+            )
+        assert response.status_code == 401
+
+    run(scenario())
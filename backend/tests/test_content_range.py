@@ -0,0 +1,96 @@
+import pytest
+
+from app import crud, schemas
+from app.content import write_variants
+from app.database import AsyncSessionFactory
+
+BODY = "0123456789abcdefghij".encode("utf-8")
+
+
+@pytest.fixture
+def ranged(run, client, auth_headers, tmp_path):
+    path = tmp_path / "ranged.md"
+    path.write_bytes(BODY)
+    write_variants(path)
+
+    async def setup():
+        async with AsyncSessionFactory() as session:
+            post = await crud.create_post(
+                session,
+                schemas.PostCreate(title="ranged", content_path=str(path), slug="ranged"),
+            )
+        return post.id, await auth_headers()
+
+    post_id, headers = run(setup())
+
+    def get(extra: dict | None = None, url: str = "/api/posts/slug/ranged/content"):
+        async def request():
+            async with client() as http:
+                return await http.get(
+                    url, headers={**headers, "Accept-Encoding": "identity", **(extra or {})}
+                )
+
+        return run(request())
+
+    get.post_id = post_id
+    return get
+
+
+def test_whole_file_advertises_ranges(ranged):
+    response = ranged()
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["content-type"] == "text/markdown; charset=utf-8"
+    by_id = ranged(url=f"/api/posts/{ranged.post_id}/content")
+    assert by_id.headers["ETag"] == response.headers["ETag"]
+
+
+@pytest.mark.parametrize(
+    ("header", "content_range", "body"),
+    [
+        ("bytes=0-3", "bytes 0-3/20", BODY[:4]),
+        ("bytes=15-", "bytes 15-19/20", BODY[15:]),
+        ("bytes=-5", "bytes 15-19/20", BODY[-5:]),
+        ("bytes=10-99", "bytes 10-19/20", BODY[10:]),
+    ],
+)
+def test_single_ranges_are_partial(ranged, header, content_range, body):
+    response = ranged({"Range": header})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == content_range
+    assert response.headers["Content-Length"] == str(len(body))
+    assert response.content == body
+
+
+def test_unsatisfiable_and_ignored_ranges(ranged):
+    beyond = ranged({"Range": "bytes=20-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["Content-Range"] == "bytes */20"
+    # multiple ranges and other units fall back to the whole file
+    assert ranged({"Range": "bytes=0-1,4-5"}).status_code == 200
+    assert ranged({"Range": "items=0-1"}).status_code == 200
+
+
+def test_ranges_address_the_identity_bytes(ranged):
+    # a gzip variant exists, but a client asking for a range gets identity bytes
+    assert ranged({"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+    response = ranged({"Range": "bytes=0-3", "Accept-Encoding": "gzip"})
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.content == BODY[:4]
+
+
+def test_if_range_only_resumes_the_same_version(ranged):
+    etag = ranged().headers["ETag"]
+    resumed = ranged({"Range": "bytes=5-", "If-Range": etag})
+    assert resumed.status_code == 206
+    stale = ranged({"Range": "bytes=5-", "If-Range": '"something-else"'})
+    assert stale.status_code == 200
+    assert stale.content == BODY
+
+
+def test_detail_can_link_to_the_raw_content(ranged):
+    response = ranged(url="/api/posts/slug/ranged?format=url")
+    assert response.json()["content"] is None
+    assert response.json()["content_url"] == f"/api/posts/{ranged.post_id}/content"
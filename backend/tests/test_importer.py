@@ -0,0 +1,69 @@
+from app.importer import (
+    assign_slugs,
+    load_manifest,
+    parse_markdown_file,
+    prepare_file,
+    remove_derived,
+    save_manifest,
+)
+
+
+def test_slugs_keep_cjk_and_disambiguate_clashes(tmp_path):
+    slugs = assign_slugs(
+        [tmp_path / "知识图谱.md", tmp_path / "Hello World.md", tmp_path / "hello_world.md"]
+    )
+    assert slugs[tmp_path / "知识图谱.md"] == "知识图谱"
+    assert slugs[tmp_path / "Hello World.md"] == "hello-world"
+    clashed = slugs[tmp_path / "hello_world.md"]
+    assert clashed.startswith("hello-world-") and len(clashed) == len("hello-world-") + 6
+
+
+def test_title_and_excerpt_come_from_the_markdown(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text(
+        "# 真正的标题\n\n第一段，带[链接](https://example.com)和 **强调**。\n\n第二段",
+        encoding="utf-8",
+    )
+    parsed = parse_markdown_file(path, "post")
+    assert parsed.title == "真正的标题"
+    assert parsed.excerpt == "第一段，带链接和 强调。"
+
+
+def test_unchanged_files_are_not_copied_again(tmp_path):
+    source_dir = tmp_path / "source"
+    target_dir = tmp_path / "content"
+    source_dir.mkdir()
+    target_dir.mkdir()
+    source = source_dir / "post.md"
+    source.write_text("# 标题\n\n正文", encoding="utf-8")
+
+    first = prepare_file(source, "post", target_dir, None)
+    assert first.changed
+    assert first.content_path == "post.md"
+    derived = sorted(path.name.rsplit(".", 1)[-1] for path in target_dir.glob("post.md.*"))
+    assert "gz" in derived and "html" in derived
+
+    destination = target_dir / "post.md"
+    destination_mtime = destination.stat().st_mtime_ns
+    again = prepare_file(source, "post", target_dir, first.digest)
+    assert not again.changed
+    assert destination.stat().st_mtime_ns == destination_mtime
+
+    source.write_text("# 标题\n\n新正文", encoding="utf-8")
+    edited = prepare_file(source, "post", target_dir, first.digest)
+    assert edited.changed
+    assert destination.read_text(encoding="utf-8").endswith("新正文")
+    # derived files of the old content are replaced, not accumulated
+    assert len(list(target_dir.glob("post.md.*.html"))) == 1
+
+    remove_derived(destination)
+    assert list(target_dir.glob("post.md.*")) == []
+
+
+def test_manifest_round_trip(tmp_path):
+    path = tmp_path / ".import-manifest.json"
+    assert load_manifest(path) == {}
+    save_manifest({"知识图谱": "abc"}, path)
+    assert load_manifest(path) == {"知识图谱": "abc"}
+    path.write_text("not json", encoding="utf-8")
+    assert load_manifest(path) == {}
@@ -0,0 +1,79 @@
+from app import main, schemas
+from app.config import settings
+from app.crud import create_post
+from app.database import AsyncSessionFactory
+from app.snapshot import listing_snapshot
+
+
+async def add_posts(count: int, start: int = 0) -> None:
+    async with AsyncSessionFactory() as session:
+        for index in range(start, start + count):
+            await create_post(
+                session,
+                schemas.PostCreate(
+                    title=f"post {index}",
+                    content_path=f"post-{index}.md",
+                    slug=f"post-{index}",
+                ),
+            )
+
+
+def no_database(*args, **kwargs):
+    raise AssertionError("the request should have been served from the snapshot")
+
+
+def test_default_list_request_is_served_from_snapshot(db, run, client, monkeypatch):
+    # the front end sends no limit, so it must land on the snapshot's page size
+    assert listing_snapshot.page_size == settings.posts_page_size
+
+    async def scenario():
+        await add_posts(3)
+        await listing_snapshot.rebuild()
+        monkeypatch.setattr(main, "open_read_session", no_database)
+        hits = listing_snapshot.hits
+        async with client() as http:
+            response = await http.get("/api/posts")
+            explicit = await http.get(
+                "/api/posts", params={"limit": settings.posts_page_size}
+            )
+        assert response.status_code == 200
+        assert [item["slug"] for item in response.json()["items"]] == [
+            "post-2",
+            "post-1",
+            "post-0",
+        ]
+        assert explicit.content == response.content
+        assert listing_snapshot.hits == hits + 2
+
+    run(scenario())
+
+
+def test_snapshot_is_bypassed_after_a_write(db, run, client):
+    async def scenario():
+        await add_posts(1)
+        await listing_snapshot.rebuild()
+        async with client() as http:
+            before = await http.get("/api/posts")
+            await add_posts(1, start=1)
+            misses = listing_snapshot.misses
+            after = await http.get("/api/posts")
+        assert len(before.json()["items"]) == 1
+        assert [item["slug"] for item in after.json()["items"]] == ["post-1", "post-0"]
+        assert listing_snapshot.misses == misses + 1
+        assert after.headers["ETag"] != before.headers["ETag"]
+
+    run(scenario())
+
+
+def test_other_limits_use_the_database(db, run, client):
+    async def scenario():
+        await add_posts(2)
+        await listing_snapshot.rebuild()
+        hits = listing_snapshot.hits
+        async with client() as http:
+            response = await http.get("/api/posts", params={"limit": 1})
+        assert [item["slug"] for item in response.json()["items"]] == ["post-1"]
+        assert response.json()["next_cursor"]
+        assert listing_snapshot.hits == hits
+
+    run(scenario())
@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import pytest
+
+from app.content import MarkdownCache
+
+
+def test_hits_are_served_without_touching_the_file(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("# 你好", encoding="utf-8")
+    cache = MarkdownCache(max_bytes=1024, revalidate_seconds=60)
+
+    async def scenario():
+        assert await cache.get(str(path)) == "# 你好"
+        path.unlink()
+        # inside the revalidation window the file is not even stat'ed
+        assert await cache.get(str(path)) == "# 你好"
+
+    asyncio.run(scenario())
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_mtime_reloads_and_missing_file_is_evicted(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("old", encoding="utf-8")
+    cache = MarkdownCache(max_bytes=1024, revalidate_seconds=0)
+
+    async def scenario():
+        assert await cache.get(str(path)) == "old"
+        assert await cache.get(str(path)) == "old"
+        path.write_text("new body", encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert await cache.get(str(path)) == "new body"
+        path.unlink()
+        with pytest.raises(FileNotFoundError):
+            await cache.get(str(path))
+
+    asyncio.run(scenario())
+    assert cache.stats()["entries"] == 0
+    assert cache.current_bytes == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.md").write_text(name * 40, encoding="utf-8")
+    cache = MarkdownCache(max_bytes=100, revalidate_seconds=60)
+
+    async def scenario():
+        await cache.get(str(tmp_path / "a.md"))
+        await cache.get(str(tmp_path / "b.md"))
+        await cache.get(str(tmp_path / "a.md"))
+        await cache.get(str(tmp_path / "c.md"))
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 80
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+    # b was the least recently used
+    assert str(tmp_path / "b.md") not in cache._entries
+
+
+def test_concurrent_misses_read_the_file_once(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("shared", encoding="utf-8")
+    cache = MarkdownCache(max_bytes=1024, revalidate_seconds=60)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get(str(path)) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["shared"] * 5
+    assert cache.misses == 1
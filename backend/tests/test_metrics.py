@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+
+from app import crud, main, schemas
+from app.config import settings
+from app.database import AsyncSessionFactory
+from app.metrics import MetricsMiddleware, Registry, registry
+
+
+def get_metrics(headers: dict | None = None) -> httpx.Response:
+    async def request():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            return await http.get("/metrics", headers=headers or {})
+
+    return asyncio.run(request())
+
+
+def test_metrics_are_off_by_default():
+    assert settings.metrics_enabled is False
+    assert get_metrics().status_code == 404
+
+
+def test_metrics_token_is_required_when_set(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+
+    assert get_metrics().status_code == 401
+    assert get_metrics({"Authorization": "Bearer wrong"}).status_code == 401
+    response = get_metrics({"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE mai_db_pool_checkouts_total counter" in response.text
+
+
+def test_registry_renders_labelled_histograms():
+    registry = Registry()
+    latency = registry.histogram(
+        "t_seconds", "test latency", ("route",), buckets=(0.1, 1.0)
+    )
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    text = registry.render()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 't_seconds_count{route="/a"} 2' in text
+
+
+def test_requests_queries_and_file_reads_are_recorded(db, run, auth_headers, tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("正文", encoding="utf-8")
+
+    async def scenario():
+        async with AsyncSessionFactory() as session:
+            await crud.create_post(
+                session, schemas.PostCreate(title="p", content_path=str(path), slug="p")
+            )
+        headers = await auth_headers()
+        # the middleware is installed at import time only when METRICS_ENABLED is set
+        transport = httpx.ASGITransport(app=MetricsMiddleware(main.app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            await http.get("/api/posts/slug/missing-1")
+            await http.get("/api/posts/slug/missing-2")
+            await http.get("/api/posts/slug/p", headers=headers)
+
+    run(scenario())
+    text = registry.render()
+    # one series per route template, not per slug
+    assert (
+        'mai_http_request_duration_seconds_count{method="GET",'
+        'route="/api/posts/slug/{slug}",status="404"} 2'
+    ) in text
+    assert "missing-1" not in text
+    assert 'mai_db_query_duration_seconds_count{database="primary",operation="SELECT"}' in text
+    assert 'mai_content_io_duration_seconds_count{operation="read"}' in text
@@ -0,0 +1,103 @@
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import crud, main, schemas
+from app.content import markdown_cache
+from app.database import AsyncSessionFactory, engine
+from app.migrations import LATEST_VERSION, MIGRATIONS, migrate, read_version
+
+# the tables as the original create_all left them: no tag tables, no keyset indexes
+LEGACY_SCHEMA = [
+    """CREATE TABLE posts (
+        id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, excerpt VARCHAR(500),
+        content_path VARCHAR(255) NOT NULL, tags VARCHAR(255), slug VARCHAR(200) UNIQUE,
+        visibility VARCHAR(50) NOT NULL,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+        updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL
+    )""",
+    "CREATE INDEX ix_posts_id ON posts (id)",
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, email VARCHAR(255) NOT NULL,
+        password_hash VARCHAR(255) NOT NULL, role VARCHAR(50) NOT NULL,
+        membership_expires_at DATETIME,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL
+    )""",
+    """INSERT INTO posts (title, content_path, tags, slug, visibility) VALUES
+        ('a', 'a.md', 'python, web', 'a', 'registered'),
+        ('b', 'b.md', 'python,python', 'b', 'member'),
+        ('c', 'c.md', '', 'c', 'registered')""",
+]
+
+
+def test_legacy_database_is_upgraded_to_the_latest_version(workdir, run):
+    path = workdir / "legacy.db"
+    path.unlink(missing_ok=True)
+    db_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def scenario():
+        async with db_engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                await conn.execute(text(statement))
+        assert await read_version(db_engine) == 0
+
+        assert await migrate(db_engine) == (0, LATEST_VERSION)
+        async with db_engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync: inspect(sync).get_table_names())
+            indexes = await conn.run_sync(
+                lambda sync: {index["name"] for index in inspect(sync).get_indexes("posts")}
+            )
+            applied = await conn.scalars(
+                text("SELECT version FROM schema_version ORDER BY version")
+            )
+            applied = applied.all()
+            counts = dict(
+                (await conn.execute(text("SELECT name, post_count FROM tags"))).all()
+            )
+            links = await conn.scalar(text("SELECT count(*) FROM post_tags"))
+        assert {"tags", "post_tags", "revoked_tokens", "schema_version"} <= set(tables)
+        assert {"ix_posts_created_at_id", "ix_posts_visibility_created_at_id"} <= indexes
+        assert applied == [migration.version for migration in MIGRATIONS]
+        assert counts == {"python": 2, "web": 1}
+        assert links == 3
+        await db_engine.dispose()
+
+    run(scenario())
+
+
+def test_up_to_date_database_costs_one_query(db, run):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def scenario():
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            assert await migrate(engine) == (LATEST_VERSION, LATEST_VERSION)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    run(scenario())
+    assert len(statements) == 1
+    assert "schema_version" in statements[0]
+
+
+def test_warm_up_fills_the_post_and_body_caches(db, run, tmp_path):
+    path = tmp_path / "warm.md"
+    path.write_text("# 预热", encoding="utf-8")
+
+    async def scenario():
+        async with AsyncSessionFactory() as session:
+            await crud.create_post(
+                session,
+                schemas.PostCreate(title="warm", content_path=str(path), slug="warm"),
+            )
+        crud.post_cache.clear()
+        markdown_cache.invalidate()
+        assert await main.warm_up(10) == (1, 1)
+        assert crud.post_cache.by_slug.get("warm") is not None
+        hits = markdown_cache.hits
+        await markdown_cache.get(str(path))
+        assert markdown_cache.hits == hits + 1
+
+    run(scenario())
@@ -0,0 +1,60 @@
+import threading
+
+from app import crud, security
+from app.config import settings
+from app.database import AsyncSessionFactory
+from app.security import _legacy_sha256, hash_password, needs_rehash, verify_password
+
+
+def test_both_schemes_verify_and_reject(monkeypatch):
+    monkeypatch.setattr(settings, "pbkdf2_iterations", 1000)
+    for scheme in ("scrypt", "pbkdf2_sha256"):
+        monkeypatch.setattr(settings, "password_hash_scheme", scheme)
+        hashed = hash_password("secret")
+        assert hashed.startswith(f"{scheme}$")
+        assert verify_password("secret", hashed)
+        assert not verify_password("wrong", hashed)
+        assert not needs_rehash(hashed)
+    assert not verify_password("secret", "scrypt$garbage")
+
+
+def test_outdated_parameters_need_a_rehash(monkeypatch):
+    hashed = hash_password("secret")
+    monkeypatch.setattr(settings, "scrypt_n", settings.scrypt_n * 2)
+    assert needs_rehash(hashed)
+    assert needs_rehash(_legacy_sha256("secret"))
+    monkeypatch.setattr(settings, "password_hash_scheme", "pbkdf2_sha256")
+    assert needs_rehash(hashed)
+
+
+def test_login_upgrades_a_legacy_hash_off_the_event_loop(db, run, client, monkeypatch):
+    threads = []
+    original = security.hash_password
+
+    def recording_hash(password: str) -> str:
+        threads.append(threading.current_thread().name)
+        return original(password)
+
+    monkeypatch.setattr(security, "hash_password", recording_hash)
+
+    async def scenario():
+        async with AsyncSessionFactory() as session:
+            await crud.create_user(session, "legacy@example.com", _legacy_sha256("secret"))
+        credentials = {"email": "legacy@example.com", "password": "secret"}
+        async with client() as http:
+            wrong = await http.post(
+                "/api/auth/login", json={**credentials, "password": "nope"}
+            )
+            first = await http.post("/api/auth/login", json=credentials)
+            again = await http.post("/api/auth/login", json=credentials)
+        async with AsyncSessionFactory() as session:
+            stored = await crud.get_user_by_email(session, "legacy@example.com")
+        assert wrong.status_code == 401
+        assert first.status_code == 200
+        assert again.status_code == 200
+        assert stored.password_hash.startswith("scrypt$")
+        # rehashed exactly once, on the dedicated pool
+        assert len(threads) == 1
+        assert threads[0].startswith("password-hash")
+
+    run(scenario())
@@ -0,0 +1,43 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import (
+    InstrumentedQueuePool,
+    count_pool_events,
+    engine_options,
+    pool_snapshot,
+)
+
+
+def make_engine(url: str):
+    db_engine = create_async_engine(url, **engine_options(url))
+    count_pool_events(db_engine.sync_engine.pool)
+    return db_engine
+
+
+def test_checkouts_are_counted_on_the_engines_own_pool(workdir, run):
+    db_engine = make_engine(f"sqlite+aiosqlite:///{workdir / 'pool.db'}")
+    assert isinstance(db_engine.sync_engine.pool, InstrumentedQueuePool)
+
+    async def scenario():
+        for _ in range(3):
+            async with db_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        stats = pool_snapshot(db_engine)
+        assert stats["checkouts"] == 3
+        assert stats["connects"] == 1
+        assert stats["max_overflow"] == settings.db_max_overflow
+        assert stats["overflow"] == db_engine.sync_engine.pool.overflow()
+
+        # dispose() recreates the pool; the counters and listeners survive it
+        await db_engine.dispose()
+        assert pool_snapshot(db_engine)["closes"] == 1
+        async with db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        stats = pool_snapshot(db_engine)
+        assert stats["checkouts"] == 4
+        assert stats["connects"] == 2
+        await db_engine.dispose()
+
+    run(scenario())
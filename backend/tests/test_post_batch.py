@@ -0,0 +1,64 @@
+from app import crud, schemas
+from app.database import AsyncSessionFactory
+
+
+async def add_post(slug: str, tmp_path, visibility: str = "registered"):
+    path = tmp_path / f"{slug}.md"
+    path.write_text(f"# {slug}", encoding="utf-8")
+    async with AsyncSessionFactory() as session:
+        return await crud.create_post(
+            session,
+            schemas.PostCreate(
+                title=slug, content_path=str(path), slug=slug, visibility=visibility
+            ),
+        )
+
+
+def test_batch_returns_a_status_per_item(run, client, auth_headers, tmp_path):
+    async def scenario():
+        open_post = await add_post("open", tmp_path)
+        await add_post("vip", tmp_path, visibility="member")
+        headers = await auth_headers()
+        payload = {"slugs": ["open", "vip", "missing", "open"], "ids": [open_post.id]}
+        async with client() as http:
+            response = await http.post("/api/posts/batch", json=payload, headers=headers)
+            anonymous = await http.post("/api/posts/batch", json={"slugs": ["open"]})
+        items = response.json()["items"]
+        # duplicates are collapsed; order follows the request
+        assert [(item["key"], item["status"]) for item in items] == [
+            ("open", 200),
+            ("vip", 403),
+            ("missing", 404),
+            (str(open_post.id), 200),
+        ]
+        assert items[0]["post"]["content"] == "# open"
+        assert items[1]["post"] is None
+        assert items[1]["detail"] == "会员可查看，升级后继续阅读"
+        assert anonymous.json()["items"][0]["status"] == 401
+
+    run(scenario())
+
+
+def test_batch_formats_and_limits(run, client, auth_headers, tmp_path):
+    async def scenario():
+        await add_post("open", tmp_path)
+        headers = await auth_headers()
+        async with client() as http:
+            html = await http.post(
+                "/api/posts/batch",
+                json={"slugs": ["open"], "format": "html"},
+                headers=headers,
+            )
+            empty = await http.post("/api/posts/batch", json={}, headers=headers)
+            too_many = await http.post(
+                "/api/posts/batch",
+                json={"slugs": [f"s{i}" for i in range(30)], "ids": list(range(1, 31))},
+                headers=headers,
+            )
+        post = html.json()["items"][0]["post"]
+        assert post["html"] == "<h1>open</h1>\n"
+        assert post["content"] is None
+        assert empty.status_code == 422
+        assert too_many.status_code == 422
+
+    run(scenario())
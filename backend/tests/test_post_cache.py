@@ -0,0 +1,78 @@
+from app import crud, models, schemas
+from app.database import AsyncSessionFactory
+from app.snapshot import listing_snapshot, notify_listing_changed
+
+
+async def add_post(slug: str, **fields) -> models.Post:
+    async with AsyncSessionFactory() as session:
+        return await crud.create_post(
+            session,
+            schemas.PostCreate(
+                title=slug, content_path=f"{slug}.md", slug=slug, **fields
+            ),
+        )
+
+
+def test_update_replaces_the_cached_post(db, run):
+    async def scenario():
+        post = await add_post("cached")
+        async with AsyncSessionFactory() as session:
+            assert (await crud.get_post_by_slug(session, "cached")).title == "cached"
+            assert crud.post_cache.by_slug.get("cached") is not None
+
+            await crud.update_post(
+                session, post, schemas.PostUpdate(title="renamed", slug="moved")
+            )
+            assert crud.post_cache.by_slug.get("cached") is None
+            assert await crud.get_post_by_slug(session, "cached") is None
+            assert (await crud.get_post(session, post.id)).title == "renamed"
+            assert (await crud.get_post_by_slug(session, "moved")).id == post.id
+
+    run(scenario())
+
+
+def test_delete_evicts_the_post_and_cached_pages(db, run):
+    async def scenario():
+        post = await add_post("doomed", tags=["tmp"])
+        async with AsyncSessionFactory() as session:
+            items, _ = await crud.list_posts(session)
+            assert [item["slug"] for item in items] == ["doomed"]
+            assert [tag.name for tag in await crud.list_tags(session)] == ["tmp"]
+            await crud.get_post(session, post.id)
+
+            await crud.delete_post(session, post)
+            assert await crud.get_post(session, post.id) is None
+            assert (await crud.list_posts(session))[0] == []
+            assert await crud.list_tags(session) == []
+
+    run(scenario())
+
+
+def test_read_that_raced_a_write_is_not_cached(db, run):
+    async def scenario():
+        post = await add_post("raced")
+        generation = crud.post_cache.generation
+        crud.post_cache.invalidate(post)
+        crud.post_cache.store(post, generation)
+        crud.post_cache.store_page(("stale",), [], None, generation)
+        assert crud.post_cache.by_id.get(post.id) is None
+        assert crud.post_cache.pages.get(("stale",)) is None
+
+    run(scenario())
+
+
+def test_script_signal_clears_the_server_caches(db, run):
+    async def scenario():
+        await add_post("external")
+        async with AsyncSessionFactory() as session:
+            await crud.get_post_by_slug(session, "external")
+            await crud.list_posts(session)
+        assert crud.post_cache.by_slug.get("external") is not None
+
+        # what clear_posts/import_markdown/migrate_tags do when they finish
+        notify_listing_changed(listing_snapshot.signal_path)
+        await listing_snapshot._check_signal()
+        assert crud.post_cache.by_slug.get("external") is None
+        assert crud.post_cache.pages.stats()["entries"] == 0
+
+    run(scenario())
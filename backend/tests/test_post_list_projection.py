@@ -0,0 +1,56 @@
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.database import AsyncSessionFactory, engine
+
+
+def test_list_rows_match_the_orm_serialization(db, run, client):
+    async def scenario():
+        async with AsyncSessionFactory() as session:
+            post = await crud.create_post(
+                session,
+                schemas.PostCreate(
+                    title="投影",
+                    excerpt="摘要",
+                    content_path="p.md",
+                    slug="p",
+                    tags=[" python ", "web"],
+                    visibility="member",
+                ),
+            )
+            expected = schemas.PostOut.model_validate(post).model_dump(mode="json")
+        async with client() as http:
+            response = await http.get("/api/posts", params={"limit": 5})
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["items"] == [expected]
+
+    run(scenario())
+
+
+def test_list_query_selects_only_the_listed_columns(db, run):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def scenario():
+        async with AsyncSessionFactory() as session:
+            await crud.create_post(
+                session, schemas.PostCreate(title="p", content_path="p.md", slug="p")
+            )
+        async with AsyncSessionFactory() as session:
+            event.listen(engine.sync_engine, "before_cursor_execute", record)
+            try:
+                items, _ = await crud.list_posts(session, limit=5)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", record)
+            # nothing was hydrated into the identity map
+            assert not any(
+                isinstance(obj, models.Post) for obj in session.identity_map.values()
+            )
+        return items
+
+    items = run(scenario())
+    assert set(items[0]) == {column.key for column in crud.POST_LIST_COLUMNS}
+    (query,) = [statement for statement in statements if "FROM posts" in statement]
+    assert "content_path" not in query
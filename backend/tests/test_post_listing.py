@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from app import crud, schemas
+from app.database import AsyncSessionFactory
+
+
+async def add_post(slug: str, **fields) -> None:
+    async with AsyncSessionFactory() as session:
+        await crud.create_post(
+            session,
+            schemas.PostCreate(title=slug, content_path=f"{slug}.md", slug=slug, **fields),
+        )
+
+
+async def walk(http, **params) -> list[list[str]]:
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, limit=2)
+        if cursor:
+            query["cursor"] = cursor
+        response = await http.get("/api/posts", params=query)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append([item["slug"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return pages
+
+
+def test_cursor_walks_every_post_once_newest_first(db, run, client):
+    async def scenario():
+        for index in range(5):
+            await add_post(f"post-{index}")
+        async with client() as http:
+            assert await walk(http) == [
+                ["post-4", "post-3"],
+                ["post-2", "post-1"],
+                ["post-0"],
+            ]
+
+    run(scenario())
+
+
+def test_new_posts_do_not_shift_later_pages(db, run, client):
+    async def scenario():
+        for index in range(4):
+            await add_post(f"post-{index}")
+        async with client() as http:
+            first = (await http.get("/api/posts", params={"limit": 2})).json()
+            # an offset page would now repeat post-2; the keyset page does not
+            await add_post("post-new")
+            second = await http.get(
+                "/api/posts", params={"limit": 2, "cursor": first["next_cursor"]}
+            )
+        assert [item["slug"] for item in second.json()["items"]] == ["post-1", "post-0"]
+
+    run(scenario())
+
+
+def test_tag_and_visibility_filters(db, run, client):
+    async def scenario():
+        await add_post("a", tags=["python"], visibility="public")
+        await add_post("b", tags=["go"], visibility="public")
+        await add_post("c", tags=["python", "go"], visibility="member")
+        await add_post("d", tags=["python"], visibility="public")
+        async with client() as http:
+            assert await walk(http, tag="python") == [["d", "c"], ["a"]]
+            assert await walk(http, visibility="public") == [["d", "b"], ["a"]]
+            assert await walk(http, tag="python", visibility="public") == [["d", "a"]]
+
+    run(scenario())
+
+
+def test_invalid_cursor_is_rejected(db, run, client):
+    async def scenario():
+        async with client() as http:
+            response = await http.get("/api/posts", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "分页游标无效"
+
+    run(scenario())
+
+
+def test_cursor_round_trip():
+    class Row:
+        id = 42
+        created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+    assert crud.decode_cursor(crud.encode_cursor(Row)) == (Row.created_at, 42)
@@ -0,0 +1,113 @@
+import gzip
+
+from app import crud, schemas
+from app.content import (
+    available_encodings,
+    content_digest,
+    markdown_cache,
+    variant_path,
+    write_variants,
+)
+from app.database import AsyncSessionFactory
+from app.http_cache import negotiate_encoding
+
+BODY = "# 标题\n\n" + "正文内容。" * 200
+
+
+async def add_post(slug: str, content_path: str) -> None:
+    async with AsyncSessionFactory() as session:
+        await crud.create_post(
+            session,
+            schemas.PostCreate(title=slug, content_path=content_path, slug=slug),
+        )
+
+
+def test_negotiation_honours_quality_values():
+    available = ["br", "gzip"]
+    assert negotiate_encoding(None, available) is None
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0", available) is None
+    assert negotiate_encoding("*", available) == "br"
+    assert negotiate_encoding("identity", available) is None
+
+
+def test_write_variants_replaces_stale_files(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("first", encoding="utf-8")
+    old = write_variants(path)
+    assert len(old) == len(available_encodings())
+
+    path.write_text("second", encoding="utf-8")
+    new = write_variants(path)
+    digest = content_digest(path.read_bytes())
+    assert new == [
+        variant_path(path, digest, encoding) for encoding in available_encodings()
+    ]
+    assert not any(stale.exists() for stale in old)
+    assert gzip.decompress(variant_path(path, digest, "gzip").read_bytes()) == b"second"
+
+
+def test_content_is_sent_precompressed_with_its_own_etag(run, client, auth_headers, tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text(BODY, encoding="utf-8")
+    write_variants(path)
+
+    async def scenario():
+        await add_post("packed", str(path))
+        user = await auth_headers()
+        url = "/api/posts/slug/packed/content"
+        async with client() as http:
+            plain = await http.get(url, headers={**user, "Accept-Encoding": "identity"})
+            packed = await http.get(url, headers={**user, "Accept-Encoding": "gzip"})
+            revalidated = await http.get(
+                url,
+                headers={
+                    **user,
+                    "Accept-Encoding": "gzip",
+                    "If-None-Match": packed.headers["ETag"],
+                },
+            )
+            # the identity validator must not match the gzip representation
+            crossed = await http.get(
+                url,
+                headers={
+                    **user,
+                    "Accept-Encoding": "gzip",
+                    "If-None-Match": plain.headers["ETag"],
+                },
+            )
+        assert plain.status_code == 200
+        assert "Content-Encoding" not in plain.headers
+        assert plain.text == BODY
+        assert packed.headers["Content-Encoding"] == "gzip"
+        assert packed.headers["Vary"] == "Accept-Encoding"
+        assert packed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+        assert int(packed.headers["Content-Length"]) < len(BODY.encode("utf-8"))
+        assert packed.text == BODY
+        assert revalidated.status_code == 304
+        assert crossed.status_code == 200
+
+    run(scenario())
+
+
+def test_missing_variant_falls_back_to_identity(run, client, auth_headers, tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("old body", encoding="utf-8")
+    write_variants(path)
+
+    async def scenario():
+        await add_post("stale", str(path))
+        user = await auth_headers()
+        # edited but not yet recompressed: the old variants no longer match the digest
+        path.write_text(BODY, encoding="utf-8")
+        markdown_cache.invalidate(str(path))
+        async with client() as http:
+            response = await http.get(
+                "/api/posts/slug/stale/content",
+                headers={**user, "Accept-Encoding": "gzip, br"},
+            )
+        assert "Content-Encoding" not in response.headers
+        assert response.text == BODY
+
+    run(scenario())
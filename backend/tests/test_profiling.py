@@ -0,0 +1,128 @@
+import asyncio
+import cProfile
+import marshal
+
+import httpx
+import pytest
+
+from app import profiling
+from app.config import settings
+from app.profiling import ProfiledSteps, ProfilerMiddleware
+
+
+def handler_work() -> int:
+    return sum(range(1000))
+
+
+def other_work() -> int:
+    return sum(range(1000))
+
+
+def profiled_names(profiler: cProfile.Profile) -> set[str]:
+    profiler.create_stats()
+    return {name for _, _, name in profiler.stats}
+
+
+def test_profiling_is_opt_in():
+    assert settings.profiling_enabled is False
+
+
+def test_only_the_profiled_coroutine_is_recorded():
+    profiler = cProfile.Profile()
+
+    async def handler():
+        for _ in range(3):
+            handler_work()
+            await asyncio.sleep(0)
+        return "done"
+
+    async def neighbour():
+        # runs on the same loop between the handler's awaits
+        for _ in range(3):
+            other_work()
+            await asyncio.sleep(0)
+
+    async def scenario():
+        result, _ = await asyncio.gather(
+            ProfiledSteps(handler(), profiler), neighbour()
+        )
+        return result
+
+    assert asyncio.run(scenario()) == "done"
+    names = profiled_names(profiler)
+    assert "handler_work" in names
+    assert "other_work" not in names
+
+
+def test_exceptions_and_cancellation_pass_through():
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def scenario():
+        with pytest.raises(ValueError, match="boom"):
+            await ProfiledSteps(failing(), cProfile.Profile())
+
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def profiled():
+            await ProfiledSteps(slow(), cProfile.Profile())
+
+        task = asyncio.create_task(profiled())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_profiled_requests_each_get_a_profile(monkeypatch):
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.01)
+        handler_work()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/plain")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def admin(scope):
+        return True
+
+    monkeypatch.setattr(profiling, "is_admin", admin)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=ProfilerMiddleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            return await asyncio.gather(
+                *(
+                    http.get("/", headers={"X-Profile": "download"})
+                    for _ in range(3)
+                )
+            )
+
+    for response in asyncio.run(scenario()):
+        assert response.status_code == 200
+        assert response.headers["X-Profile-Status"] == "200"
+        stats = marshal.loads(response.content)
+        assert "handler_work" in {name for _, _, name in stats}
+
+
+def test_non_admin_is_refused():
+    async def app(scope, receive, send):
+        raise AssertionError("not reached")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=ProfilerMiddleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            return await http.get("/", headers={"X-Profile": "text"})
+
+    assert asyncio.run(scenario()).status_code == 403
@@ -0,0 +1,159 @@
+import httpx
+import pytest
+
+from app import crud, database, main
+from app.database import (
+    ReplicaRouter,
+    engine,
+    open_read_session,
+    pool_snapshot,
+    replica_router,
+)
+from app.migrations import migrate
+from app.security import token_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    # both files get the schema; nothing replicates, so rows written to the
+    # primary are missing on the replica and show where a read was served from
+    yield
+    crud.user_cache.clear()
+    token_cache.clear()
+
+
+async def migrate_both() -> None:
+    await migrate(engine)
+    await migrate(replica_router.engines[0])
+
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app), base_url="http://testserver"
+    )
+
+
+def test_round_robin_alternates_between_replicas(workdir, run):
+    router = ReplicaRouter(
+        [
+            f"sqlite+aiosqlite:///{workdir / 'replica-a.db'}",
+            f"sqlite+aiosqlite:///{workdir / 'replica-b.db'}",
+        ]
+    )
+    try:
+        picks = [router.choose() for _ in range(6)]
+        assert sorted(set(picks)) == [0, 1]
+        assert all(first != second for first, second in zip(picks, picks[1:]))
+
+        router.mark_failed(picks[-1])
+        assert {router.choose() for _ in range(4)} == {1 - picks[-1]}
+    finally:
+        run(router.dispose())
+
+
+def test_unreachable_replica_falls_back_to_primary(workdir, run, monkeypatch):
+    broken = ReplicaRouter([f"sqlite+aiosqlite:///{workdir / 'missing' / 'replica.db'}"])
+    monkeypatch.setattr(database, "replica_router", broken)
+
+    async def scenario():
+        try:
+            session = await open_read_session()
+            async with session:
+                assert session.bind is engine
+            assert broken.fallbacks == 1
+            assert broken.snapshot()[0]["healthy"] is False
+
+            # marked unhealthy: the next read goes straight to the primary
+            session = await open_read_session()
+            async with session:
+                assert session.bind is engine
+            assert broken.fallbacks == 2
+        finally:
+            await broken.dispose()
+
+    run(scenario())
+
+
+def test_reads_use_replica_by_default(run):
+    async def scenario():
+        await migrate_both()
+        session = await open_read_session()
+        async with session:
+            assert session.bind is replica_router.engines[0]
+        session = await open_read_session(prefer_primary=True)
+        async with session:
+            assert session.bind is engine
+
+    run(scenario())
+
+
+def test_replica_checkouts_are_counted_separately(run):
+    async def scenario():
+        await migrate_both()
+        primary = pool_snapshot(engine)["checkouts"]
+        replica = replica_router.snapshot()[0]["pool"]["checkouts"]
+        for _ in range(3):
+            session = await open_read_session()
+            async with session:
+                assert session.bind is replica_router.engines[0]
+        assert pool_snapshot(engine)["checkouts"] == primary
+        assert replica_router.snapshot()[0]["pool"]["checkouts"] == replica + 3
+
+    run(scenario())
+
+
+def test_register_token_reads_own_writes_from_primary(run):
+    async def scenario():
+        await migrate_both()
+        async with client() as http:
+            response = await http.post(
+                "/api/auth/register",
+                json={"email": "rpw-register@example.com", "password": "secret123"},
+            )
+            assert response.status_code == 200
+            fresh = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            # the user exists only on the primary; rpw routes /me there
+            response = await http.get("/api/auth/me", headers=fresh)
+            assert response.status_code == 200
+            assert response.json()["email"] == "rpw-register@example.com"
+
+            response = await http.post(
+                "/api/auth/login",
+                json={"email": "rpw-register@example.com", "password": "secret123"},
+            )
+            assert response.status_code == 200
+            plain = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            # a login token carries no rpw claim, so the read hits the empty replica
+            crud.user_cache.clear()
+            response = await http.get("/api/auth/me", headers=plain)
+            assert response.status_code == 401
+
+    run(scenario())
+
+
+def test_upgrade_token_reads_new_membership_from_primary(run):
+    async def scenario():
+        await migrate_both()
+        async with client() as http:
+            await http.post(
+                "/api/auth/register",
+                json={"email": "rpw-upgrade@example.com", "password": "secret123"},
+            )
+            response = await http.post(
+                "/api/auth/login",
+                json={"email": "rpw-upgrade@example.com", "password": "secret123"},
+            )
+            plain = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            response = await http.post("/api/auth/upgrade", headers=plain)
+            assert response.status_code == 200
+            upgraded = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            crud.user_cache.clear()
+            response = await http.get("/api/auth/me", headers=upgraded)
+            assert response.status_code == 200
+            assert response.json()["role"] == "member"
+
+    run(scenario())
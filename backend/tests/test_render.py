@@ -0,0 +1,46 @@
+import asyncio
+
+from app.content import MarkdownCache
+from app.render import RenderCache, render_markdown, write_rendered
+
+
+def test_render_sanitizes_and_highlights():
+    html = render_markdown(
+        "# 标题\n\n<script>alert(1)</script>\n\n```python\nprint('hi')\n```\n"
+    )
+    assert "<h1>标题</h1>" in html
+    assert "<script>" not in html
+    assert '<pre class="highlight"><code class="language-python">' in html
+    assert '<span class="nb">print</span>' in html
+
+
+def test_renders_once_then_serves_memory_and_disk(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("**粗体**", encoding="utf-8")
+    markdown = MarkdownCache(max_bytes=1024, revalidate_seconds=60)
+
+    async def scenario(cache: RenderCache) -> list[str]:
+        entry = await markdown.get_entry(str(path))
+        return await asyncio.gather(*(cache.get(str(path), entry) for _ in range(3)))
+
+    cache = RenderCache(max_bytes=1024)
+    assert asyncio.run(scenario(cache)) == ["<p><strong>粗体</strong></p>\n"] * 3
+    assert (cache.renders, cache.hits) == (1, 0)
+    assert asyncio.run(scenario(cache))[0].startswith("<p><strong>")
+    assert cache.hits == 3
+
+    # a restarted worker reuses the HTML written next to the Markdown
+    restarted = RenderCache(max_bytes=1024)
+    asyncio.run(scenario(restarted))
+    assert (restarted.renders, restarted.disk_hits) == (0, 1)
+
+
+def test_write_rendered_drops_html_for_old_content(tmp_path):
+    path = tmp_path / "post.md"
+    path.write_text("first", encoding="utf-8")
+    old = write_rendered(path)
+    path.write_text("second", encoding="utf-8")
+    new = write_rendered(path)
+    assert not old.exists()
+    assert new.read_text(encoding="utf-8") == "<p>second</p>\n"
+    assert list(tmp_path.glob("post.md.*.html")) == [new]
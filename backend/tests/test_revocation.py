@@ -0,0 +1,81 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from sqlalchemy import select
+
+from app import crud, models
+from app.config import settings
+from app.database import AsyncSessionFactory
+from app.revocation import sync_revocations
+from app.security import ALGORITHM, revoked_tokens
+
+
+def test_logout_rejects_the_token_at_once(run, client, auth_headers):
+    async def scenario():
+        headers = await auth_headers()
+        other = await auth_headers("member", email="other@example.com")
+        async with client() as http:
+            # the first request puts the decoded token in the token cache
+            assert (await http.get("/api/auth/me", headers=headers)).status_code == 200
+            logout = await http.post("/api/auth/logout", headers=headers)
+            after = await http.get("/api/auth/me", headers=headers)
+            again = await http.post("/api/auth/logout", headers=headers)
+            unaffected = await http.get("/api/auth/me", headers=other)
+        assert logout.status_code == 204
+        assert after.status_code == 401
+        assert after.json()["detail"] == "登录已注销，请重新登录"
+        assert again.status_code == 401
+        assert unaffected.status_code == 200
+        async with AsyncSessionFactory() as session:
+            rows = (await session.execute(select(models.RevokedToken))).scalars().all()
+        assert len(rows) == 1
+
+    run(scenario())
+
+
+def test_tokens_without_jti_cannot_log_out(db, run, client):
+    # issued before jti existed
+    expires = datetime.now(timezone.utc) + timedelta(minutes=5)
+    token = jwt.encode({"sub": "1", "exp": expires}, settings.secret_key, algorithm=ALGORITHM)
+
+    async def scenario():
+        async with client() as http:
+            return await http.post(
+                "/api/auth/logout", headers={"Authorization": f"Bearer {token}"}
+            )
+
+    response = run(scenario())
+    assert response.status_code == 400
+    assert response.json()["detail"] == "该凭证不支持注销，请等待其过期"
+
+
+def test_other_workers_pick_up_revocations_on_sync(db, run):
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        async with AsyncSessionFactory() as session:
+            # revoked by another worker: only the database knows about these
+            await crud.revoke_token(session, "live", 1, now + timedelta(minutes=5))
+            # revoking the same token twice keeps one row
+            await crud.revoke_token(session, "live", 1, now + timedelta(minutes=5))
+            await crud.revoke_token(session, "expired", 1, now - timedelta(minutes=5))
+        assert not revoked_tokens.is_revoked("live")
+
+        assert await sync_revocations() == 1
+        assert revoked_tokens.is_revoked("live")
+        assert not revoked_tokens.is_revoked("expired")
+        last_id = revoked_tokens.last_id
+        # incremental polls only fetch newer rows
+        assert await sync_revocations() == 0
+        assert revoked_tokens.last_id == last_id
+
+        # a full resync prunes expired rows and drops them from memory
+        revoked_tokens.add("gone", time.time() - 1)
+        assert await sync_revocations(full=True) == 1
+        assert not revoked_tokens.is_revoked("gone")
+        async with AsyncSessionFactory() as session:
+            jtis = await session.scalars(select(models.RevokedToken.jti))
+            assert jtis.all() == ["live"]
+
+    run(scenario())
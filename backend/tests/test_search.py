@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from app import search
+from app.search import IndexedDocument, SearchIndex, document_terms, tokenize
+
+
+def document(title: str, body: str = "") -> IndexedDocument:
+    terms = document_terms(title, None, body)
+    return IndexedDocument(fingerprint=title, terms=terms, length=sum(terms.values()))
+
+
+def test_tokenize_splits_latin_words_and_cjk_bigrams():
+    assert tokenize("FastAPI 部署指南 v2") == ["fastapi", "部署", "署指", "指南", "v2"]
+
+
+def test_search_ranks_title_matches_first(tmp_path):
+    index = SearchIndex(tmp_path / "index.json")
+    index.add(1, document("docker 笔记", "部署 部署"))
+    index.add(2, document("部署指南", "docker"))
+    index.add(3, document("unrelated"))
+    total, hits = index.search("部署")
+    assert total == 2
+    assert [post_id for post_id, _ in hits] == [2, 1]
+
+
+def test_failed_save_is_retried(tmp_path, monkeypatch):
+    index = SearchIndex(tmp_path / "index.json")
+    index.add(1, document("docker"))
+    dump = index._dump
+
+    def full_disk(documents):
+        raise OSError(28, "No space left on device")
+
+    async def scenario():
+        monkeypatch.setattr(index, "_dump", full_disk)
+        with pytest.raises(OSError):
+            await index.save()
+        assert index.dirty
+        monkeypatch.setattr(index, "_dump", dump)
+        await index.save()
+        assert not index.dirty
+
+    asyncio.run(scenario())
+    payload = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))
+    assert list(payload["documents"]) == ["1"]
+    assert [path.name for path in tmp_path.iterdir()] == ["index.json"]
+
+
+def test_saved_index_loads_back(tmp_path):
+    index = SearchIndex(tmp_path / "index.json")
+    index.add(7, document("向量检索", "embedding"))
+    asyncio.run(index.save())
+
+    loaded = SearchIndex(tmp_path / "index.json")
+    loaded._load()
+    assert loaded.documents == index.documents
+    assert loaded.search("检索")[1][0][0] == 7
+
+
+def test_flush_loop_survives_a_failed_round(tmp_path, monkeypatch):
+    index = SearchIndex(tmp_path / "index.json")
+    index.add(1, document("docker"))
+    monkeypatch.setattr(search, "search_index", index)
+    dump = index._dump
+    attempts = []
+
+    def flaky(documents):
+        attempts.append(len(documents))
+        if len(attempts) == 1:
+            raise PermissionError("read-only file system")
+        dump(documents)
+
+    monkeypatch.setattr(index, "_dump", flaky)
+
+    async def scenario():
+        task = asyncio.create_task(search.flush_periodically(0.01))
+        try:
+            for _ in range(100):
+                if len(attempts) >= 2:
+                    break
+                await asyncio.sleep(0.01)
+            # the failed round was logged, not raised out of the loop
+            assert not task.done()
+        finally:
+            task.cancel()
+
+    asyncio.run(scenario())
+    assert attempts[:2] == [1, 1]
+    assert (tmp_path / "index.json").exists()
+    assert not index.dirty
+
+
+def test_wait_for_sync_request(tmp_path):
+    index = SearchIndex(tmp_path / "index.json")
+
+    async def scenario():
+        assert await index.wait_for_sync_request(0.01) is False
+        index.request_sync()
+        assert await index.wait_for_sync_request(1) is True
+        # consumed: the next wait times out again
+        assert await index.wait_for_sync_request(0.01) is False
+
+    asyncio.run(scenario())
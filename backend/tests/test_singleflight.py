@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app import crud, schemas
+from app.database import AsyncSessionFactory
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_load():
+    flight = SingleFlight("test-share")
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", load) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight("test-failure")
+    attempts = []
+
+    async def load():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database down")
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(flight.do("key", load) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # the failed flight is gone; the next call loads again
+        with pytest.raises(RuntimeError):
+            await flight.do("key", load)
+
+    asyncio.run(scenario())
+    assert len(attempts) == 2
+    assert flight.stats()["errors"] == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    flight = SingleFlight("test-cancel")
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def load():
+            await gate.wait()
+            return "value"
+
+        first = asyncio.create_task(flight.do("key", load))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("key", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        assert await second == "value"
+        assert first.cancelled()
+
+    asyncio.run(scenario())
+
+
+class ClosedSession:
+    # stands in for a request session that was closed while others waited on it
+    bind = None
+
+    def __getattr__(self, name):
+        raise AssertionError(f"the shared load must not use the caller's session ({name})")
+
+
+def test_post_load_uses_its_own_session(db, run):
+    async def scenario():
+        async with AsyncSessionFactory() as session:
+            post = await crud.create_post(
+                session,
+                schemas.PostCreate(
+                    title="shared", content_path="shared.md", slug="shared"
+                ),
+            )
+        crud.post_cache.clear()
+        loads = crud.post_flights.loads
+        posts = await asyncio.gather(
+            *(crud.get_post_by_slug(ClosedSession(), "shared") for _ in range(5))
+        )
+        assert {loaded.id for loaded in posts} == {post.id}
+        assert crud.post_flights.loads == loads + 1
+        # the load filled both keys: a lookup by id is a plain cache hit
+        assert (await crud.get_post(ClosedSession(), post.id)).slug == "shared"
+        assert crud.post_flights.loads == loads + 1
+
+    run(scenario())
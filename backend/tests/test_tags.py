@@ -0,0 +1,69 @@
+from sqlalchemy import select, text
+
+from app import crud, models, schemas
+from app.database import AsyncSessionFactory, engine
+
+
+async def add_post(slug: str, tags: list[str]) -> models.Post:
+    async with AsyncSessionFactory() as session:
+        return await crud.create_post(
+            session,
+            schemas.PostCreate(title=slug, content_path=f"{slug}.md", slug=slug, tags=tags),
+        )
+
+
+async def tag_counts() -> dict[str, int]:
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(select(models.Tag.name, models.Tag.post_count))
+        return dict(result.all())
+
+
+def test_counts_follow_create_update_and_delete(db, run):
+    async def scenario():
+        first = await add_post("first", ["python", "web", "python"])
+        await add_post("second", ["python"])
+        assert await tag_counts() == {"python": 2, "web": 1}
+
+        async with AsyncSessionFactory() as session:
+            await crud.update_post(session, first, schemas.PostUpdate(tags="web, go"))
+        assert await tag_counts() == {"python": 1, "web": 1, "go": 1}
+
+        async with AsyncSessionFactory() as session:
+            await crud.delete_post(session, await crud.get_post_by_slug(session, "second"))
+            links = (await session.execute(select(models.PostTag))).scalars().all()
+        assert await tag_counts() == {"python": 0, "web": 1, "go": 1}
+        assert {link.post_id for link in links} == {first.id}
+
+    run(scenario())
+
+
+def test_tags_endpoint_lists_facets_by_count(db, run, client):
+    async def scenario():
+        await add_post("a", ["python", "web"])
+        await add_post("b", ["python"])
+        await add_post("c", ["go"])
+        async with AsyncSessionFactory() as session:
+            await crud.delete_post(session, await crud.get_post_by_slug(session, "c"))
+        async with client() as http:
+            response = await http.get("/api/tags")
+        # unused tags are hidden; ties are ordered by name
+        assert [(tag["name"], tag["post_count"]) for tag in response.json()] == [
+            ("python", 2),
+            ("web", 1),
+        ]
+
+    run(scenario())
+
+
+def test_tag_filter_uses_the_post_tags_index(db, run):
+    async def scenario():
+        await add_post("a", ["python"])
+        stmt = crud._filter_posts(select(models.Post.id), "python", None)
+        compiled = stmt.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+        async with engine.connect() as conn:
+            plan = (await conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))).all()
+        details = " ".join(row[-1] for row in plan)
+        assert "ix_post_tags_tag_id_post_id" in details
+        assert "LIKE" not in str(compiled)
+
+    run(scenario())
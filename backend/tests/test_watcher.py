@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app import crud, importer, watcher
+from app.database import AsyncSessionFactory
+from app.watcher import ContentWatcher, _file_lock, apply_changes
+
+
+@pytest.fixture
+def content_dir(tmp_path, monkeypatch):
+    manifest = tmp_path / ".import-manifest.json"
+    monkeypatch.setattr(watcher, "CONTENT_DIR", tmp_path)
+    monkeypatch.setattr(watcher, "load_manifest", lambda: importer.load_manifest(manifest))
+    monkeypatch.setattr(
+        watcher, "save_manifest", lambda data: importer.save_manifest(data, manifest)
+    )
+    return tmp_path
+
+
+async def post_titles() -> dict[str, str]:
+    async with AsyncSessionFactory() as session:
+        items, _ = await crud.list_posts(session, limit=50, cached=False)
+    return {item["slug"]: item["title"] for item in items}
+
+
+def test_create_update_and_delete_follow_the_files(db, run, content_dir):
+    path = content_dir / "笔记.md"
+
+    async def scenario():
+        path.write_text("# 初稿\n\n正文", encoding="utf-8")
+        summary = await apply_changes({path}, set())
+        assert summary == {"created": 1, "updated": 0, "deleted": 0}
+        assert await post_titles() == {"笔记": "初稿"}
+
+        # unchanged content is not an update
+        assert (await apply_changes({path}, set()))["updated"] == 0
+        path.write_text("# 定稿\n\n正文", encoding="utf-8")
+        assert (await apply_changes({path}, set()))["updated"] == 1
+        assert await post_titles() == {"笔记": "定稿"}
+
+        path.unlink()
+        assert (await apply_changes(set(), {path}))["deleted"] == 1
+        assert await post_titles() == {}
+        assert list(content_dir.glob("笔记.md.*")) == []
+
+    run(scenario())
+
+
+def test_polling_watcher_applies_settled_changes(db, run, content_dir):
+    content_watcher = ContentWatcher(
+        content_dir, debounce_seconds=0.05, poll_seconds=0.05, force_polling=True
+    )
+
+    async def scenario():
+        task = asyncio.create_task(content_watcher._watch())
+        try:
+            await asyncio.sleep(0.1)
+            (content_dir / "new-post.md").write_text("# 新文章\n\n内容", encoding="utf-8")
+            for _ in range(50):
+                await asyncio.sleep(0.05)
+                if await post_titles():
+                    break
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        assert await post_titles() == {"new-post": "新文章"}
+
+    run(scenario())
+
+
+def test_only_one_worker_holds_the_file_lock(tmp_path):
+    lock_path = tmp_path / ".watcher.lock"
+
+    async def scenario():
+        async with _file_lock(lock_path) as first:
+            async with _file_lock(lock_path) as second:
+                assert (first, second) == (True, False)
+        async with _file_lock(lock_path) as again:
+            assert again is True
+
+    asyncio.run(scenario())
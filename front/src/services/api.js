@@ -32,15 +32,66 @@ const withAuthHeaders = (options = {}, token) => {
   return options
 }
 
-export const fetchPosts = async () => {
-  const response = await fetch(`${API_BASE_URL}/api/posts`)
+// one page per call; without a limit the server uses its default page size,
+// which is also the size of its prebuilt listing snapshot
+export const fetchPostPage = async ({ cursor, limit, tag, visibility } = {}) => {
+  const params = new URLSearchParams()
+  if (cursor) params.set('cursor', cursor)
+  if (limit) params.set('limit', String(limit))
+  if (tag) params.set('tag', tag)
+  if (visibility) params.set('visibility', visibility)
+  const query = params.toString()
+  const response = await fetch(
+    `${API_BASE_URL}/api/posts${query ? `?${query}` : ''}`
+  )
+  return handleResponse(response)
+}
+
+export const fetchPostMeta = async (slug) => {
+  const response = await fetch(`${API_BASE_URL}/api/posts/slug/${slug}/meta`)
   return handleResponse(response)
 }
 
-export const fetchPostBySlug = async (slug, token) => {
+export const fetchPostBySlug = async (slug, token, { format } = {}) => {
+  const query = format ? `?format=${encodeURIComponent(format)}` : ''
   const response = await fetch(
-    `${API_BASE_URL}/api/posts/slug/${slug}`,
+    `${API_BASE_URL}/api/posts/slug/${slug}${query}`,
     withAuthHeaders({}, token)
   )
   return handleResponse(response)
 }
+
+export const fetchPostsBatch = async (
+  { slugs = [], ids = [], format } = {},
+  token
+) => {
+  const response = await fetch(
+    `${API_BASE_URL}/api/posts/batch`,
+    withAuthHeaders(
+      {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ slugs, ids, ...(format ? { format } : {}) }),
+      },
+      token
+    )
+  )
+  // items carry their own status (200/401/403/404) per requested slug or id
+  const data = await handleResponse(response)
+  return data.items
+}
+
+export const searchPosts = async (q, { offset = 0, limit = 20 } = {}) => {
+  const params = new URLSearchParams({
+    q,
+    offset: String(offset),
+    limit: String(limit),
+  })
+  const response = await fetch(`${API_BASE_URL}/api/search?${params}`)
+  return handleResponse(response)
+}
+
+export const fetchTags = async () => {
+  const response = await fetch(`${API_BASE_URL}/api/tags`)
+  return handleResponse(response)
+}
@@ -61,3 +61,14 @@ export const upgradeMembership = async (token) => {
   })
   return handleResponse(response)
 }
+
+export const logout = async (token) => {
+  const response = await fetch(`${API_BASE_URL}/api/auth/logout`, {
+    method: 'POST',
+    headers: {
+      ...jsonHeaders,
+      Authorization: `Bearer ${token}`,
+    },
+  })
+  return handleResponse(response)
+}
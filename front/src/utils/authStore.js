@@ -1,5 +1,11 @@
 import { reactive } from 'vue'
-import { fetchMe, login as loginApi, register as registerApi, upgradeMembership } from '../services/auth'
+import {
+  fetchMe,
+  login as loginApi,
+  logout as logoutApi,
+  register as registerApi,
+  upgradeMembership,
+} from '../services/auth'
 
 const state = reactive({
   user: null,
@@ -64,9 +70,17 @@ const register = async (email, password) => {
   }
 }
 
-const logout = () => {
+const logout = async () => {
+  const token = state.token
   persistToken('')
   state.user = null
+  if (!token) return
+  try {
+    // revoke server-side too, so a copied token stops working before it expires
+    await logoutApi(token)
+  } catch (err) {
+    console.error('failed to revoke token', err)
+  }
 }
 
 const upgrade = async () => {
@@ -74,8 +88,9 @@ const upgrade = async () => {
   state.loading = true
   try {
     const data = await upgradeMembership(state.token)
-    state.user = data
-    return data
+    persistToken(data.access_token)
+    state.user = data.user
+    return data.user
   } finally {
     state.loading = false
   }
@@ -54,3 +54,7 @@ export const resolveCategoryKey = (tags) => {
 
 export const getCategoryMeta = (key) => categories.find((item) => item.key === key)
 
+
+// tag names (from /api/tags) whose posts fall under the given category
+export const categoryTags = (tags, key) =>
+  tags.filter((tag) => resolveCategoryKey([tag.name]) === key)